@@ -163,10 +163,47 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # A file rather than the shared in-memory database, so concurrent writers in
+        # tests wait on SQLite's busy timeout instead of failing with "table is locked"
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
 
+# Cache
+# Set REDIS_URL (requires the `redis` package) so every worker shares one cache and
+# invalidations reach all of them; otherwise each process keeps its own local cache.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a rendered public menu stays cached; edits invalidate it immediately
+PUBLIC_MENU_CACHE_TIMEOUT = int(os.environ.get("PUBLIC_MENU_CACHE_TIMEOUT", "300"))
+
+# POS barcode lookups: per-process LRU of serialized products. The shared tier (the cache
+# above) lets invalidations reach other workers; the TTL bounds staleness without it.
+BARCODE_CACHE_SIZE = int(os.environ.get("BARCODE_CACHE_SIZE", "5000"))
+BARCODE_CACHE_TTL = int(os.environ.get("BARCODE_CACHE_TTL", "30"))
+BARCODE_CACHE_SHARED = os.environ.get("BARCODE_CACHE_SHARED", "True" if REDIS_URL else "False") == "True"
+
+# Finished orders and sales older than this move to the archive tables (manage.py archive_history)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "365"))
+
+# Supermarket receipt numbers restart every day (RCP-<system>-<YYYYMMDD>-<seq>) unless disabled
+RECEIPT_NUMBER_RESET_DAILY = os.environ.get("RECEIPT_NUMBER_RESET_DAILY", "True") == "True"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,79 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DateField, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+
+def day_start(day):
+    """Aware datetime at midnight of `day` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def calendar_periods(today):
+    """Today/week/month and the matching previous periods as inclusive (start_date, end_date) pairs."""
+    yesterday = today - timedelta(days=1)
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    last_month_end = month_start - timedelta(days=1)
+    return {
+        "today": (today, today),
+        "yesterday": (yesterday, yesterday),
+        "week": (week_start, today),
+        "last_week": (week_start - timedelta(days=7), week_start - timedelta(days=1)),
+        "month": (month_start, today),
+        "last_month": (last_month_end.replace(day=1), last_month_end),
+    }
+
+
+def count_for_periods(queryset, periods, field="created_at"):
+    """
+    Row counts for several inclusive (start_date, end_date) periods in one aggregate query.
+
+    Each period becomes a `Count(filter=Q(field__gte=..., field__lt=...))` over plain
+    datetime bounds, so an index on `field` can serve the whole query.
+    """
+    if not periods:
+        return {}
+    bounds = {
+        name: (day_start(start_date), day_start(end_date + timedelta(days=1)))
+        for name, (start_date, end_date) in periods.items()
+    }
+    overall_start = min(start for start, _ in bounds.values())
+    overall_end = max(end for _, end in bounds.values())
+    return queryset.filter(
+        **{f"{field}__gte": overall_start, f"{field}__lt": overall_end}
+    ).aggregate(**{
+        name: Count("pk", filter=Q(**{f"{field}__gte": start, f"{field}__lt": end}))
+        for name, (start, end) in bounds.items()
+    })
+
+
+def date_buckets(start_date, end_date, interval="daily"):
+    """Every day (or every first-of-month for "monthly") from start_date through end_date."""
+    if interval == "daily":
+        return [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+    buckets = []
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        buckets.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return buckets
+
+
+def time_series(queryset, start_date, end_date, interval="daily", field="created_at", value=None, default=0):
+    """
+    `value` (default: row count) per day or month in one grouped query, truncated
+    in the database. Every bucket from start_date to end_date is present; buckets
+    with no rows get `default`. Filter `queryset` to the range first.
+    Returns an ordered list of (date, value).
+    """
+    kind = "day" if interval == "daily" else "month"
+    rows = (
+        queryset.annotate(bucket=Trunc(field, kind, output_field=DateField()))
+        .values("bucket")
+        .annotate(value=value or Count("pk"))
+        .order_by()
+    )
+    found = {row["bucket"]: row["value"] for row in rows}
+    return [(bucket, found.get(bucket, default)) for bucket in date_buckets(start_date, end_date, interval)]
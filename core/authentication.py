@@ -0,0 +1,21 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class QueryParamJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that also accepts the access token as `?token=...`.
+    Browsers' EventSource cannot send an Authorization header, so streaming
+    endpoints use this; the header is still preferred when present.
+    """
+
+    def authenticate(self, request):
+        header_auth = super().authenticate(request)
+        if header_auth is not None:
+            return header_auth
+
+        raw_token = request.query_params.get("token")
+        if not raw_token:
+            return None
+
+        validated_token = self.get_validated_token(raw_token.encode())
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,44 @@
+import hashlib
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ResourceVersion
+
+
+class ConditionalListMixin:
+    """
+    ETag / If-None-Match support for polled list endpoints.
+
+    The ETag is derived from the system's ResourceVersion rows for `etag_resources`
+    plus the user and query string, so a matching client gets `304 Not Modified`
+    after one small lookup, without querying or serializing the list itself.
+    Writes bump the versions through model signals (see ResourceVersion.bump).
+    """
+    etag_resources = ()
+
+    def list_etag(self, request):
+        system_id = self.kwargs.get("system_id")
+        versions = ResourceVersion.versions(system_id, self.etag_resources)
+        key = "|".join([
+            str(request.user.pk),
+            request.path,
+            "&".join(sorted(request.GET.urlencode().split("&"))),
+            ",".join(f"{name}:{version}" for name, version in sorted(versions.items())),
+        ])
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def conditional_response(self, request, render):
+        """Return 304 if the client's ETag is current, otherwise `render()` with an ETag header."""
+        etag = self.list_etag(request)
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = render()
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalListMixin, self).list(request, *args, **kwargs))
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from restaurant.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from supermarket.models import ArchivedSale, ArchivedSaleItem, Sale, SaleItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed/canceled restaurant orders and supermarket sales older than --days "
+        "into the archive tables, one atomic chunk at a time. Daily rollups already hold "
+        "their totals, so dashboards are unaffected. Schedule it daily, e.g. "
+        "`0 3 * * * python manage.py archive_history` (cron) or a Heroku Scheduler job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "ARCHIVE_AFTER_DAYS", 365),
+            help="Archive records created more than this many days ago (default: ARCHIVE_AFTER_DAYS or 365)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="Records moved per transaction")
+        parser.add_argument("--system", type=int, help="Only archive this system")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        orders = Order.objects.filter(status__in=["completed", "canceled"], created_at__lt=cutoff)
+        sales = Sale.objects.filter(created_at__lt=cutoff)
+        if options["system"]:
+            orders = orders.filter(system_id=options["system"])
+            sales = sales.filter(system_id=options["system"])
+
+        archived_orders = self.archive_in_chunks(orders, self.archive_orders, options["chunk_size"])
+        archived_sales = self.archive_in_chunks(sales, self.archive_sales, options["chunk_size"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived_orders} orders and {archived_sales} sales created before {cutoff:%Y-%m-%d}."
+        ))
+
+    def archive_in_chunks(self, queryset, archive_chunk, chunk_size):
+        total = 0
+        while True:
+            with transaction.atomic():
+                # Lock the chunk so a concurrent status change cannot slip in between copy and delete
+                ids = list(
+                    queryset.select_for_update().order_by("id").values_list("id", flat=True)[:chunk_size]
+                )
+                if not ids:
+                    return total
+                archive_chunk(ids)
+            total += len(ids)
+
+    def archive_orders(self, ids):
+        orders = Order.objects.filter(id__in=ids).select_related("payment")
+        items = OrderItem.objects.filter(order_id__in=ids).select_related("menu_item")
+
+        archived = []
+        for order in orders:
+            payment = getattr(order, "payment", None)
+            archived.append(ArchivedOrder(
+                id=order.id,
+                system_id=order.system_id,
+                customer_name=order.customer_name,
+                table_number=order.table_number,
+                waiter_id=order.waiter_id,
+                total_price=order.total_price,
+                delivery_address=order.delivery_address,
+                customer_phone=order.customer_phone,
+                order_type=order.order_type,
+                status=order.status,
+                amount_paid=payment.amount_paid if payment else None,
+                payment_method=payment.payment_method if payment else None,
+                paid_at=payment.paid_at if payment else None,
+                created_at=order.created_at,
+                updated_at=order.updated_at,
+            ))
+
+        archived_items = []
+        for item in items:
+            item.snapshot_prices()  # Lines created before price snapshots existed
+            archived_items.append(ArchivedOrderItem(
+                id=item.id,
+                order_id=item.order_id,
+                menu_item_id=item.menu_item_id,
+                menu_item_name=item.menu_item.name,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                unit_cost=item.unit_cost,
+                unit_discount=item.unit_list_price - item.unit_price,
+                line_total=item.line_total,
+            ))
+
+        ArchivedOrder.objects.bulk_create(archived)
+        ArchivedOrderItem.objects.bulk_create(archived_items)
+        # Queryset delete: Order.delete() would take the orders back out of the daily rollups
+        Order.objects.filter(id__in=ids).delete()
+
+    def archive_sales(self, ids):
+        sales = Sale.objects.filter(id__in=ids)
+        items = SaleItem.objects.filter(sale_id__in=ids).select_related("product")
+
+        ArchivedSale.objects.bulk_create([
+            ArchivedSale(
+                id=sale.id,
+                system_id=sale.system_id,
+                cashier_id=sale.cashier_id,
+                total_price=sale.total_price,
+                discount_percentage=sale.discount_percentage,
+                payment_type=sale.payment_type,
+                receipt_number=sale.receipt_number,
+                created_at=sale.created_at,
+            )
+            for sale in sales
+        ])
+        ArchivedSaleItem.objects.bulk_create([
+            ArchivedSaleItem(
+                id=item.id,
+                sale_id=item.sale_id,
+                product_id=item.product_id,
+                product_name=item.product.name if item.product else "",
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                unit_cost=item.unit_cost,
+                discount_amount=item.discount_amount,
+                total_price=item.total_price,
+            )
+            for item in items
+        ])
+        # Queryset delete: Sale.delete() would reverse the rollup, SaleItem.delete() would restock
+        Sale.objects.filter(id__in=ids).delete()
@@ -0,0 +1,164 @@
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import DailySalesRollup
+from restaurant.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from supermarket.models import ArchivedSale, ArchivedSaleItem, Sale, SaleItem
+
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild DailySalesRollup rows from completed restaurant orders and supermarket sales, "
+        "including those moved to the archive tables. Use after deploying the rollup table or to repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--system", type=int, help="Only rebuild this system")
+        parser.add_argument("--since", help="Only rebuild days on or after this date (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        system_id = options.get("system")
+        since = None
+        if options.get("since"):
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("Invalid --since date. Use YYYY-MM-DD")
+
+        rows = defaultdict(lambda: {
+            "order_count": 0,
+            "revenue": Decimal("0"),
+            "cost": Decimal("0"),
+            "profit": Decimal("0"),
+            "discount": Decimal("0"),
+        })
+
+        # Live and archived rows never overlap: archiving moves them in one transaction
+        sources = [
+            self.restaurant_totals(
+                Order, OrderItem, system_id, since,
+                unit_discount=F("unit_list_price") - F("unit_price"),
+            ),
+            self.restaurant_totals(
+                ArchivedOrder, ArchivedOrderItem, system_id, since,
+                unit_discount=F("unit_discount"),
+            ),
+            self.supermarket_totals(Sale, SaleItem, system_id, since),
+            self.supermarket_totals(ArchivedSale, ArchivedSaleItem, system_id, since),
+        ]
+        for source in sources:
+            for key, totals in source:
+                self.merge(rows[key], totals)
+
+        existing = DailySalesRollup.objects.all()
+        if system_id:
+            existing = existing.filter(system_id=system_id)
+        if since:
+            existing = existing.filter(day__gte=since)
+
+        with transaction.atomic():
+            deleted, _ = existing.delete()
+            DailySalesRollup.objects.bulk_create(
+                [
+                    DailySalesRollup(system_id=sys_id, day=day, **totals)
+                    for (sys_id, day), totals in rows.items()
+                ],
+                batch_size=500,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Replaced {deleted} rollup rows with {len(rows)} rebuilt rows.")
+        )
+
+    def merge(self, row, totals):
+        for field, value in totals.items():
+            row[field] += value or 0
+
+    def since_filter(self, prefix, since):
+        if not since:
+            return {}
+        start = timezone.make_aware(datetime.combine(since, time.min))
+        return {f"{prefix}created_at__gte": start}
+
+    def restaurant_totals(self, order_model, item_model, system_id, since, unit_discount):
+        orders = order_model.objects.filter(status="completed", **self.since_filter("", since))
+        items = item_model.objects.filter(order__status="completed", **self.since_filter("order__", since))
+        if system_id:
+            orders = orders.filter(system_id=system_id)
+            items = items.filter(order__system_id=system_id)
+
+        counts = (
+            orders.annotate(day=TruncDate("created_at"))
+            .values("system_id", "day")
+            .annotate(order_count=Count("id"))
+            .order_by()
+        )
+        for row in counts:
+            yield (row["system_id"], row["day"]), {"order_count": row["order_count"]}
+
+        sums = (
+            items.annotate(day=TruncDate("order__created_at"))
+            .values("order__system_id", "day")
+            .annotate(
+                revenue=Sum("line_total"),
+                cost=Sum(F("unit_cost") * F("quantity"), output_field=MONEY),
+                discount=Sum(unit_discount * F("quantity"), output_field=MONEY),
+            )
+            .order_by()
+        )
+        for row in sums:
+            revenue = row["revenue"] or 0
+            cost = row["cost"] or 0
+            yield (row["order__system_id"], row["day"]), {
+                "revenue": revenue,
+                "cost": cost,
+                "profit": revenue - cost,
+                "discount": row["discount"],
+            }
+
+    def supermarket_totals(self, sale_model, item_model, system_id, since):
+        sales = sale_model.objects.filter(system__isnull=False, **self.since_filter("", since))
+        items = item_model.objects.filter(
+            sale__system__isnull=False, product_id__isnull=False, **self.since_filter("sale__", since)
+        )
+        if system_id:
+            sales = sales.filter(system_id=system_id)
+            items = items.filter(sale__system_id=system_id)
+
+        counts = (
+            sales.annotate(day=TruncDate("created_at"))
+            .values("system_id", "day")
+            .annotate(order_count=Count("id"))
+            .order_by()
+        )
+        for row in counts:
+            yield (row["system_id"], row["day"]), {"order_count": row["order_count"]}
+
+        sums = (
+            items.annotate(day=TruncDate("sale__created_at"))
+            .values("sale__system_id", "day")
+            .annotate(
+                revenue=Sum("total_price"),
+                cost=Sum(F("unit_cost") * F("quantity"), output_field=MONEY),
+                profit=Sum((F("unit_price") - F("unit_cost")) * F("quantity"), output_field=MONEY),
+                discount=Sum(F("discount_amount") * F("quantity"), output_field=MONEY),
+            )
+            .order_by()
+        )
+        for row in sums:
+            yield (row["sale__system_id"], row["day"]), {
+                "revenue": row["revenue"],
+                "cost": row["cost"],
+                "profit": row["profit"],
+                "discount": row["discount"],
+            }
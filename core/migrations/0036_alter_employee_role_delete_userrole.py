@@ -7,6 +7,8 @@ class Migration(migrations.Migration):
 
     dependencies = [
         ("core", "0035_alter_passwordresetotp_expires_at"),
+        # Order.waiter pointed at UserRole until this restaurant migration
+        ("restaurant", "0009_alter_order_waiter"),
     ]
 
     operations = [
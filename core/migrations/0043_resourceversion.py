@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=50)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_versions', to='core.system')),
+            ],
+            options={
+                'unique_together': {('system', 'resource')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('day', models.DateField(blank=True, null=True)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sequence_counters', to='core.system')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sequencecounter',
+            constraint=models.UniqueConstraint(fields=('system', 'name', 'day'), name='unique_daily_sequence_counter'),
+        ),
+        migrations.AddConstraint(
+            model_name='sequencecounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('day__isnull', True)), fields=('system', 'name'), name='unique_sequence_counter'),
+        ),
+    ]
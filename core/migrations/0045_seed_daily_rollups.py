@@ -0,0 +1,123 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+MONEY = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+def restaurant_totals(order_model, item_model, unit_discount):
+    orders = order_model.objects.filter(status='completed')
+    items = item_model.objects.filter(order__status='completed')
+    for row in (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('system_id', 'day')
+        .annotate(order_count=Count('id'))
+        .order_by()
+    ):
+        yield (row['system_id'], row['day']), {'order_count': row['order_count']}
+    for row in (
+        items.annotate(day=TruncDate('order__created_at'))
+        .values('order__system_id', 'day')
+        .annotate(
+            revenue=Sum('line_total'),
+            cost=Sum(F('unit_cost') * F('quantity'), output_field=MONEY),
+            discount=Sum(unit_discount * F('quantity'), output_field=MONEY),
+        )
+        .order_by()
+    ):
+        revenue = row['revenue'] or 0
+        cost = row['cost'] or 0
+        yield (row['order__system_id'], row['day']), {
+            'revenue': revenue,
+            'cost': cost,
+            'profit': revenue - cost,
+            'discount': row['discount'],
+        }
+
+
+def supermarket_totals(sale_model, item_model):
+    sales = sale_model.objects.filter(system__isnull=False)
+    items = item_model.objects.filter(sale__system__isnull=False, product_id__isnull=False)
+    for row in (
+        sales.annotate(day=TruncDate('created_at'))
+        .values('system_id', 'day')
+        .annotate(order_count=Count('id'))
+        .order_by()
+    ):
+        yield (row['system_id'], row['day']), {'order_count': row['order_count']}
+    for row in (
+        items.annotate(day=TruncDate('sale__created_at'))
+        .values('sale__system_id', 'day')
+        .annotate(
+            revenue=Sum('total_price'),
+            cost=Sum(F('unit_cost') * F('quantity'), output_field=MONEY),
+            profit=Sum((F('unit_price') - F('unit_cost')) * F('quantity'), output_field=MONEY),
+            discount=Sum(F('discount_amount') * F('quantity'), output_field=MONEY),
+        )
+        .order_by()
+    ):
+        yield (row['sale__system_id'], row['day']), {
+            'revenue': row['revenue'],
+            'cost': row['cost'],
+            'profit': row['profit'],
+            'discount': row['discount'],
+        }
+
+
+def seed_daily_rollups(apps, schema_editor):
+    """
+    Build the rollups from existing orders and sales, as `rebuild_daily_rollups` does,
+    so dashboards show history as soon as they read from DailySalesRollup.
+    """
+    DailySalesRollup = apps.get_model('core', 'DailySalesRollup')
+
+    rows = defaultdict(lambda: {
+        'order_count': 0,
+        'revenue': Decimal('0'),
+        'cost': Decimal('0'),
+        'profit': Decimal('0'),
+        'discount': Decimal('0'),
+    })
+    sources = [
+        restaurant_totals(
+            apps.get_model('restaurant', 'Order'), apps.get_model('restaurant', 'OrderItem'),
+            unit_discount=F('unit_list_price') - F('unit_price'),
+        ),
+        restaurant_totals(
+            apps.get_model('restaurant', 'ArchivedOrder'), apps.get_model('restaurant', 'ArchivedOrderItem'),
+            unit_discount=F('unit_discount'),
+        ),
+        supermarket_totals(apps.get_model('supermarket', 'Sale'), apps.get_model('supermarket', 'SaleItem')),
+        supermarket_totals(
+            apps.get_model('supermarket', 'ArchivedSale'), apps.get_model('supermarket', 'ArchivedSaleItem')
+        ),
+    ]
+    for source in sources:
+        for key, totals in source:
+            for field, value in totals.items():
+                rows[key][field] += value or 0
+
+    # Replace rather than add, so databases that already ran the rebuild command stay correct
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(system_id=system_id, day=day, **totals) for (system_id, day), totals in rows.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_sequencecounter'),
+        # The order item price snapshots (0017) and list prices (0024) must be backfilled first
+        ('restaurant', '0024_orderitem_unit_list_price'),
+        ('supermarket', '0030_archivedsale_archivedsaleitem_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth.models import User
 import uuid
 from django.utils import timezone
@@ -223,6 +224,160 @@ def delete_slider_image(sender, instance, **kwargs):
     delete_cloudinary_image(instance.image)
 
 
+class DailySalesRollup(models.Model):
+    """
+    Per-system, per-business-day sales totals, kept up to date as restaurant orders
+    complete and supermarket sales are made. Dashboards read one row per day instead
+    of rescanning orders. Rebuild with `manage.py rebuild_daily_rollups`.
+    """
+
+    system = models.ForeignKey(
+        System, on_delete=models.CASCADE, related_name="daily_rollups"
+    )
+    day = models.DateField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("system", "day")
+        ordering = ["day"]
+
+    def __str__(self):
+        return f"{self.system_id} - {self.day}: {self.order_count} orders"
+
+    @classmethod
+    def record(cls, system_id, day, orders=1, revenue=0, cost=0, profit=0, discount=0):
+        """
+        Add (or, with negative values, remove) one set of totals to a day's row.
+        Uses an atomic `UPDATE ... SET x = x + n` so concurrent checkouts never lose updates.
+        """
+        increments = {
+            "order_count": F("order_count") + orders,
+            "revenue": F("revenue") + (revenue or 0),
+            "cost": F("cost") + (cost or 0),
+            "profit": F("profit") + (profit or 0),
+            "discount": F("discount") + (discount or 0),
+            "updated_at": timezone.now(),
+        }
+        with transaction.atomic():
+            rows = cls.objects.filter(system_id=system_id, day=day)
+            if rows.update(**increments):
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        system_id=system_id,
+                        day=day,
+                        order_count=orders,
+                        revenue=revenue or 0,
+                        cost=cost or 0,
+                        profit=profit or 0,
+                        discount=discount or 0,
+                    )
+            except IntegrityError:
+                # Another transaction created the row first
+                rows.update(**increments)
+
+
+class ResourceVersion(models.Model):
+    """
+    Per-system change counter for a polled resource ("orders", "menu", "products", ...).
+    Bumped on every write so list endpoints can answer If-None-Match with 304
+    by reading this one small table instead of the resource itself.
+    """
+
+    system = models.ForeignKey(
+        System, on_delete=models.CASCADE, related_name="resource_versions"
+    )
+    resource = models.CharField(max_length=50)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("system", "resource")
+
+    def __str__(self):
+        return f"{self.system_id} - {self.resource}: v{self.version}"
+
+    @classmethod
+    def bump(cls, system_id, *resources):
+        """Increment the version of each resource for a system (creating rows on first write)."""
+        if not system_id:
+            return
+        with transaction.atomic():
+            for resource in resources:
+                rows = cls.objects.filter(system_id=system_id, resource=resource)
+                if rows.update(version=F("version") + 1):
+                    continue
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(system_id=system_id, resource=resource, version=1)
+                except IntegrityError:
+                    # Another transaction created the row first
+                    rows.update(version=F("version") + 1)
+
+    @classmethod
+    def versions(cls, system_id, resources):
+        """Current versions for several resources in one query; unknown resources are 0."""
+        found = dict(
+            cls.objects.filter(system_id=system_id, resource__in=resources).values_list("resource", "version")
+        )
+        return {resource: found.get(resource, 0) for resource in resources}
+
+
+class SequenceCounter(models.Model):
+    """
+    Per-system named counter ("receipt", ...), optionally restarted every day.
+    Allocation is a single row-locking `UPDATE ... SET last_value = last_value + n`,
+    so concurrent writers get distinct, gap-free numbers without scanning any table.
+    """
+
+    system = models.ForeignKey(
+        System, on_delete=models.CASCADE, related_name="sequence_counters"
+    )
+    name = models.CharField(max_length=50)
+    day = models.DateField(null=True, blank=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["system", "name", "day"], name="unique_daily_sequence_counter"
+            ),
+            # NULL days never collide in the constraint above
+            models.UniqueConstraint(
+                fields=["system", "name"],
+                condition=models.Q(day__isnull=True),
+                name="unique_sequence_counter",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.system_id} - {self.name} {self.day or ''}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, system_id, name, count=1, day=None):
+        """
+        Reserve `count` consecutive values and return the last one; the block is
+        `range(last - count + 1, last + 1)`. The row stays locked until the caller's
+        transaction ends, so a rolled-back checkout gives its numbers back.
+        """
+        with transaction.atomic():
+            rows = cls.objects.filter(system_id=system_id, name=name, day=day)
+            if not rows.update(last_value=F("last_value") + count):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(system_id=system_id, name=name, day=day, last_value=count)
+                    return count
+                except IntegrityError:
+                    # Another transaction created the row first
+                    rows.update(last_value=F("last_value") + count)
+            return rows.values_list("last_value", flat=True).get()
+
+
 from django.contrib.auth.hashers import make_password, check_password
 
 
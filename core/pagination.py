@@ -1,5 +1,7 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+ROW_SIZES = {'low': 10, 'mid': 20, 'high': 50}
 
-from rest_framework.pagination import PageNumberPagination
 
 class CustomPagination(PageNumberPagination):
     page_query_param = 'page'
@@ -8,10 +10,34 @@ class CustomPagination(PageNumberPagination):
 
     def get_page_size(self, request):
         rows = request.query_params.get(self.page_size_query_param)
-        if rows == 'mid':
-            return 20
-        elif rows == 'high':
-            return 50
-        elif rows == 'low':
-            return 10
+        if rows in ROW_SIZES:
+            return ROW_SIZES[rows]
         return super().get_page_size(request)
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id), newest first: no COUNT(*) and no OFFSET,
+    so every page costs the same however deep it is.
+
+    Opt-in: requests without `rows` or `cursor` get the unpaginated response
+    they always had, unless `opt_in` is False. `rows` accepts low/mid/high or a
+    number (max 100).
+    """
+    ordering = ('-created_at', '-id')
+    opt_in = True
+    page_size = 20
+    page_size_query_param = 'rows'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        rows = request.query_params.get(self.page_size_query_param)
+        if rows in ROW_SIZES:
+            return ROW_SIZES[rows]
+        return super().get_page_size(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.opt_in and self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
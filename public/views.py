@@ -2,6 +2,7 @@ from django.shortcuts import render
 from django.http import Http404
 from core.models import System
 from restaurant.views import restaurant_public_view
+from restaurant.cache import get_public_menu, set_public_menu
 from supermarket.views import supermarket_public_view
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -10,7 +11,7 @@ from core.serializers import PublicSystemSerializer, PublicSliderImageSerializer
 from rest_framework.request import Request as DRFRequest
 from rest_framework.renderers import JSONRenderer
 from rest_framework.views import APIView
-from supermarket.models import Product
+from supermarket.barcode_cache import get_product as get_cached_product
 import logging
 from rest_framework.permissions import AllowAny
 
@@ -105,6 +106,15 @@ class public_view(APIView):
         if isinstance(request, DRFRequest):
             request = request._request
 
+        # Restaurant menus are served from cache without touching the database;
+        # entries are invalidated by menu item, system and slider image changes
+        subdomain = request.headers.get('x-subdomain')
+        cached_menu = get_public_menu(subdomain)
+        if cached_menu is not None:
+            response = Response(cached_menu)
+            response['x-category'] = 'restaurant'
+            return response
+
         system, error_response = get_system_from_request(request)
         if error_response:
             return error_response
@@ -117,6 +127,7 @@ class public_view(APIView):
             response = restaurant_public_view(request, system)
             response.data['system'] = common_data
             response['x-category'] = 'restaurant'  # Add x-category header
+            set_public_menu(subdomain, response.data)
         elif system.category == 'supermarket': 
             response = supermarket_public_view(request, system)
             response.data['system'] = common_data
@@ -141,19 +152,11 @@ class public_barcode_view(APIView):
         if error_response:
             return error_response
 
-        try:
-            product = Product.objects.get(system=system, barcode=barcode, stock_quantity__gt=0)
-            product_data = {
-                "id": product.id,
-                "name": product.name,
-                "category": product.category,
-                "price": str(product.price),
-                "barcode": product.barcode,
-                "image": product.image.url if product.image else None,
-            }
-            return Response(product_data)
-        except Product.DoesNotExist:
+        product = get_cached_product(system.id, barcode)
+        if product is None or product["stock_quantity"] <= 0:
             return Response(
                 {"detail": "Product not found with the given barcode."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        fields = ("id", "name", "category", "price", "barcode", "image")
+        return Response({field: product[field] for field in fields})
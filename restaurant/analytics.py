@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.analytics import time_series
+from core.models import DailySalesRollup
+
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def daily_rollups(system, start_date, end_date):
+    """Rollup rows (one per business day with completed orders) for an inclusive date range."""
+    return DailySalesRollup.objects.filter(
+        system=system, day__gte=start_date, day__lte=end_date, order_count__gt=0
+    )
+
+
+def profit_for_periods(system, periods):
+    """
+    Profit for several (start_date, end_date) periods in a single aggregate query.
+    `periods` maps a name to an inclusive date range; returns name -> Decimal.
+    """
+    if not periods:
+        return {}
+    overall_start = min(start for start, _ in periods.values())
+    overall_end = max(end for _, end in periods.values())
+    aggregates = {
+        name: Coalesce(
+            Sum("profit", filter=Q(day__gte=start_date, day__lte=end_date)),
+            Value(Decimal("0")),
+            output_field=MONEY,
+        )
+        for name, (start_date, end_date) in periods.items()
+    }
+    return daily_rollups(system, overall_start, overall_end).aggregate(**aggregates)
+
+
+def profit_series(system, start_date, end_date, interval="daily"):
+    """Profit per day (or month) in one query, as (date, Decimal) pairs with empty periods at zero."""
+    return time_series(
+        daily_rollups(system, start_date, end_date),
+        start_date,
+        end_date,
+        interval,
+        field="day",
+        value=Sum("profit"),
+        default=Decimal("0"),
+    )
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+def public_menu_key(subdomain):
+    return f"public-menu:{subdomain}"
+
+
+def get_public_menu(subdomain):
+    """Cached public menu payload for a subdomain, or None."""
+    if not subdomain:
+        return None
+    return cache.get(public_menu_key(subdomain))
+
+
+def set_public_menu(subdomain, payload):
+    cache.set(public_menu_key(subdomain), payload, settings.PUBLIC_MENU_CACHE_TIMEOUT)
+
+
+def invalidate_public_menu(*subdomains):
+    keys = [public_menu_key(subdomain) for subdomain in subdomains if subdomain]
+    if keys:
+        cache.delete_many(keys)
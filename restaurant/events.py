@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Order, OrderEvent
+from .serializers import OrderSerializer
+
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1  # seconds between checks for new events, per system and process
+HEARTBEAT_INTERVAL = 15  # keep proxies from closing an idle stream
+STREAM_LIFETIME = 300  # close periodically; EventSource reconnects with Last-Event-ID
+RETRY_MS = 3000
+BATCH_SIZE = 100
+
+
+def format_event(event_id, event_type, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+def latest_event_id(system_id):
+    last = OrderEvent.objects.filter(system_id=system_id).order_by("-id").values_list("id", flat=True).first()
+    return last or 0
+
+
+def pending_events(system_id, after_id):
+    """
+    Events after `after_id` with the current state of their orders, serialized in one pass.
+    Returns (last_seen_id, [(event_id, sse_message), ...]).
+    """
+    events = list(
+        OrderEvent.objects.filter(system_id=system_id, id__gt=after_id).order_by("id")[:BATCH_SIZE]
+    )
+    if not events:
+        return after_id, []
+
+    orders = Order.objects.filter(id__in={event.order_id for event in events}).prefetch_related(
+        "order_items__menu_item"
+    )
+    serialized = {order["id"]: order for order in OrderSerializer(orders, many=True).data}
+
+    messages = [
+        (event.id, format_event(event.id, event.event_type, {
+            "order_id": event.order_id,
+            "status": event.status,
+            "order": serialized.get(event.order_id),
+        }))
+        for event in events
+    ]
+    return events[-1].id, messages
+
+
+class SystemEventPoller:
+    """
+    One polling loop per system in each event loop (i.e. per ASGI worker process), shared
+    by every open stream of that system: N kitchen screens cost one OrderEvent query per
+    POLL_INTERVAL, and each batch is serialized once. The loop stops with its last stream.
+    """
+
+    pollers = {}
+
+    def __init__(self, key, system_id, cursor):
+        self.key = key
+        self.system_id = system_id
+        self.cursor = cursor
+        self.subscribers = set()
+        self.task = None
+
+    @classmethod
+    async def subscribe(cls, system_id):
+        """Join the system's poller, starting it if needed. Returns (poller, queue of (id, message))."""
+        key = (asyncio.get_running_loop(), system_id)
+        if key not in cls.pollers:
+            cursor = await sync_to_async(latest_event_id)(system_id)
+            cls.pollers.setdefault(key, cls(key, system_id, cursor))
+        poller = cls.pollers[key]
+        queue = asyncio.Queue()
+        poller.subscribers.add(queue)
+        if poller.task is None:
+            poller.task = asyncio.create_task(poller.run())
+        return poller, queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                try:
+                    self.cursor, messages = await sync_to_async(pending_events)(self.system_id, self.cursor)
+                except Exception:
+                    logger.exception("Polling order events of system %s failed", self.system_id)
+                    messages = []
+                for queue in self.subscribers:
+                    for message in messages:
+                        queue.put_nowait(message)
+                if len(messages) < BATCH_SIZE:
+                    await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            if self.pollers.get(self.key) is self:
+                del self.pollers[self.key]
+
+
+async def order_event_stream(system_id, last_event_id=None):
+    """Async generator of SSE messages for one system, resuming after `last_event_id`."""
+    poller, queue = await SystemEventPoller.subscribe(system_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        # The shared poller delivers events after its cursor; replay the ones a
+        # resuming client missed up to there from the database.
+        cursor = caught_up = poller.cursor
+        if last_event_id is not None and last_event_id < caught_up:
+            cursor = last_event_id
+            while cursor < caught_up:
+                _, messages = await sync_to_async(pending_events)(system_id, cursor)
+                messages = [(event_id, message) for event_id, message in messages if event_id <= caught_up]
+                if not messages:
+                    break
+                for event_id, message in messages:
+                    yield message
+                cursor = messages[-1][0]
+        elif last_event_id is not None:
+            cursor = last_event_id
+
+        deadline = time.monotonic() + STREAM_LIFETIME
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event_id, message = await asyncio.wait_for(queue.get(), min(HEARTBEAT_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                if remaining > HEARTBEAT_INTERVAL:
+                    yield ": keep-alive\n\n"
+                continue
+            if event_id > cursor:
+                cursor = event_id
+                yield message
+    finally:
+        poller.unsubscribe(queue)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from restaurant.models import OrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill unit_list_price, unit_price, unit_cost and line_total on order items that are still "
+        "missing them, using the current menu item price, discount and cost. Migrations 0017 and "
+        "0024 backfill existing rows; use this to re-run the backfill or repair rows written since."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of order items updated per query (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pending = OrderItem.objects.filter(
+            Q(unit_price__isnull=True) | Q(unit_list_price__isnull=True)
+        ).select_related("menu_item")
+        total = pending.count()
+        self.stdout.write(f"Found {total} order items without price snapshots...")
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not batch:
+                break
+            for item in batch:
+                item.snapshot_prices()
+            with transaction.atomic():
+                OrderItem.objects.bulk_update(batch, ["unit_list_price", "unit_price", "unit_cost", "line_total"])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"  {updated}/{total}")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} order items."))
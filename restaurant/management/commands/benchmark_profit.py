@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.models import System
+from restaurant.analytics import profit_for_periods, profit_series
+from restaurant.models import MenuItem, Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the restaurant profit engine: seeds completed orders at growing volumes "
+        "inside a rolled-back transaction and reports the query count of each report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("system_id", type=int, help="Restaurant system to benchmark against")
+        parser.add_argument(
+            "--volumes",
+            default="10,100,1000",
+            help="Comma separated order counts to seed (default: 10,100,1000)",
+        )
+        parser.add_argument(
+            "--items-per-order",
+            type=int,
+            default=3,
+            help="Order items created per seeded order (default: 3)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            system = System.objects.get(id=options["system_id"], category="restaurant")
+        except System.DoesNotExist:
+            raise CommandError("Restaurant system not found.")
+
+        volumes = sorted(int(v) for v in options["volumes"].split(",") if v.strip())
+        today = date.today()
+        periods = {
+            "today": (today, today),
+            "yesterday": (today - timedelta(days=1), today - timedelta(days=1)),
+            "month": (today.replace(day=1), today),
+        }
+
+        with transaction.atomic():
+            menu_item = MenuItem.objects.create(
+                system=system, name="Benchmark item", price=100, cost=40,
+                is_best_deal=True, discount_percent=10,
+            )
+            seeded = 0
+            for volume in volumes:
+                orders = Order.objects.bulk_create(
+                    Order(system=system, status="pending", table_number="1")
+                    for _ in range(volume - seeded)
+                )
+                items = [
+                    OrderItem(order=order, menu_item=menu_item, quantity=2)
+                    for order in orders
+                    for _ in range(options["items_per_order"])
+                ]
+                for item in items:
+                    item.snapshot_prices()
+                OrderItem.objects.bulk_create(items)
+                # Complete through save() so the daily rollup is maintained as in production
+                for order in orders:
+                    order.status = "completed"
+                    order.save()
+                seeded = volume
+
+                with CaptureQueriesContext(connection) as summary_queries:
+                    profit_for_periods(system, periods)
+                with CaptureQueriesContext(connection) as trend_queries:
+                    profit_series(system, today - timedelta(days=29), today)
+
+                self.stdout.write(
+                    f"{volume:>8} orders: summary={len(summary_queries)} queries, "
+                    f"trend={len(trend_queries)} queries"
+                )
+
+            # Never keep the seeded rows
+            transaction.set_rollback(True)
@@ -0,0 +1,119 @@
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.files.base import ContentFile
+from django.db import transaction
+from requests.adapters import HTTPAdapter
+
+from core.models import ResourceVersion
+from .cache import invalidate_public_menu
+from .models import MenuItem
+
+
+MAX_IMPORT_ROWS = 1000
+IMAGE_FETCH_WORKERS = 8
+IMAGE_FETCH_TIMEOUT = (5, 20)  # (connect, read) seconds
+
+
+def image_session(pool_size=IMAGE_FETCH_WORKERS):
+    """One HTTP session with a connection pool sized for the image workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_image(image_url, session=None):
+    """Download an image URL; returns (file_name, ContentFile). Raises requests exceptions."""
+    response = (session or requests).get(image_url, timeout=IMAGE_FETCH_TIMEOUT)
+    response.raise_for_status()
+    file_name = os.path.basename(image_url.split("?")[0]) or "menuitem_image.jpg"
+    return file_name, ContentFile(response.content)
+
+
+def parse_import_rows(request):
+    """
+    Rows from a JSON list (or {"items": [...]}) body, or an uploaded CSV `file`
+    whose header names MenuItemSerializer fields. Empty CSV cells are dropped.
+    """
+    upload = request.FILES.get("file")
+    if upload is not None:
+        reader = csv.DictReader(io.StringIO(upload.read().decode("utf-8-sig")))
+        return [
+            {key.strip(): value for key, value in row.items() if key and value not in ("", None)}
+            for row in reader
+        ]
+    data = request.data
+    if isinstance(data, dict):
+        data = data.get("items")
+    return data if isinstance(data, list) else None
+
+
+def import_menu_items(system, rows, serializer_class, context):
+    """
+    Validate every row, bulk_create the valid ones, then fetch their images
+    concurrently. Returns a per-row report (row numbers are 1-based).
+    """
+    report = []
+    pending = []  # (report entry, MenuItem, image_url)
+    for number, row in enumerate(rows, start=1):
+        serializer = serializer_class(data=row, context=context)
+        if not serializer.is_valid():
+            report.append({"row": number, "status": "error", "errors": serializer.errors})
+            continue
+        data = dict(serializer.validated_data)
+        image_url = data.pop("image_url", None)
+        entry = {"row": number, "status": "created"}
+        report.append(entry)
+        pending.append((entry, MenuItem(system=system, **data), image_url))
+
+    if not pending:
+        return report
+
+    with transaction.atomic():
+        MenuItem.objects.bulk_create([item for _, item, _ in pending])
+        # bulk_create skips the post_save receivers, so do their work once here
+        ResourceVersion.bump(system.id, "menu", "orders")
+    for entry, item, _ in pending:
+        entry["id"] = item.id
+
+    with_images = [(entry, item, url) for entry, item, url in pending if url]
+    if with_images and attach_images(with_images):
+        # The image paths are saved with bulk_update, which sends no signals either;
+        # bump again so ETags issued while images were fetching are not reused
+        ResourceVersion.bump(system.id, "menu", "orders")
+    invalidate_public_menu(system.subdomain)
+    return report
+
+
+def attach_images(rows):
+    """
+    Fetch and store images through a bounded thread pool, then save all image paths
+    in one query. Returns the items whose image was stored.
+    """
+    session = image_session()
+
+    def download_and_store(row):
+        entry, item, image_url = row
+        try:
+            file_name, content = fetch_image(image_url, session)
+            # Uploads to the storage backend without touching the database from this thread
+            item.image.save(file_name, content, save=False)
+            return item
+        except Exception as exc:
+            entry["image_error"] = f"Failed to fetch image: {exc}"
+            return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=IMAGE_FETCH_WORKERS) as executor:
+            stored = [item for item in executor.map(download_and_store, rows) if item is not None]
+    finally:
+        session.close()
+
+    if stored:
+        MenuItem.objects.bulk_update(stored, ["image"])
+    return stored
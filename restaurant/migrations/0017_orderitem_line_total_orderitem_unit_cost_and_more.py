@@ -0,0 +1,56 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:42
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 500
+
+
+def backfill_prices(apps, schema_editor):
+    """Snapshot existing lines from their menu item, as OrderItem.snapshot_prices does."""
+    OrderItem = apps.get_model('restaurant', 'OrderItem')
+
+    pending = OrderItem.objects.filter(unit_price__isnull=True).select_related('menu_item').order_by('pk')
+    batch = []
+    for item in pending.iterator(chunk_size=BATCH_SIZE):
+        menu_item = item.menu_item
+        price = menu_item.price
+        if menu_item.is_best_deal and menu_item.discount_percent > 0:
+            price = price * (1 - menu_item.discount_percent / 100)
+        item.unit_price = Decimal(price).quantize(Decimal('0.01'))
+        item.unit_cost = menu_item.cost
+        item.line_total = item.unit_price * item.quantity
+        batch.append(item)
+        if len(batch) == BATCH_SIZE:
+            OrderItem.objects.bulk_update(batch, ['unit_price', 'unit_cost', 'line_total'])
+            batch = []
+    if batch:
+        OrderItem.objects.bulk_update(batch, ['unit_price', 'unit_cost', 'line_total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0016_menuitem_discount_percent_menuitem_is_best_deal_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
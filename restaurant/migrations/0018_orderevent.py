@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_dailysalesrollup'),
+        ('restaurant', '0017_orderitem_line_total_orderitem_unit_cost_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('created', 'Created'), ('status_changed', 'Status Changed')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('served', 'Served'), ('out_for_delivery', 'Out for Delivery'), ('completed', 'Completed'), ('canceled', 'Canceled')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='restaurant.order')),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_events', to='core.system')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['system', 'id'], name='restaurant__system__297277_idx')],
+            },
+        ),
+    ]
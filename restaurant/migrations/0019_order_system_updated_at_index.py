@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_dailysalesrollup'),
+        ('restaurant', '0018_orderevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['system', 'updated_at'], name='restaurant__system__4db0f4_idx'),
+        ),
+    ]
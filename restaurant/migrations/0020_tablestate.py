@@ -0,0 +1,58 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_table_states(apps, schema_editor):
+    Order = apps.get_model('restaurant', 'Order')
+    TableState = apps.get_model('restaurant', 'TableState')
+
+    # The oldest active order on a table is the one that holds it. Other orders already
+    # double-booked on it stay unclaimed; Order.save leaves them be until they move or reopen.
+    active_orders = Order.objects.filter(
+        order_type='in_house',
+        status__in=['pending', 'preparing', 'ready', 'served'],
+    ).exclude(table_number__isnull=True).exclude(table_number='').select_related('waiter__user').order_by('id')
+
+    states = {}
+    for order in active_orders:
+        key = (order.system_id, order.table_number)
+        if key in states:
+            continue
+        waiter = order.waiter
+        states[key] = TableState(
+            system_id=order.system_id,
+            table_number=order.table_number,
+            order=order,
+            status=order.status,
+            waiter_name=waiter.user.username if waiter and waiter.user else None,
+        )
+    TableState.objects.bulk_create(states.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+        ('restaurant', '0019_order_system_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_number', models.CharField(max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('served', 'Served'), ('out_for_delivery', 'Out for Delivery'), ('completed', 'Completed'), ('canceled', 'Canceled')], max_length=20)),
+                ('waiter_name', models.CharField(blank=True, max_length=150, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='table_state', to='restaurant.order')),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='table_states', to='core.system')),
+            ],
+            options={
+                'unique_together': {('system', 'table_number')},
+            },
+        ),
+        migrations.RunPython(populate_table_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:52
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+        ('restaurant', '0020_tablestate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['system', 'min_threshold'], name='restaurant__system__9fd041_idx'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='inventory_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_uses', to='restaurant.inventoryitem'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='menu_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='restaurant.menuitem'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeingredient',
+            unique_together={('menu_item', 'inventory_item')},
+        ),
+    ]
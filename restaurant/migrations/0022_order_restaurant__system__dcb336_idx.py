@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+        ('restaurant', '0021_recipeingredient'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['system', 'created_at'], name='restaurant__system__dcb336_idx'),
+        ),
+    ]
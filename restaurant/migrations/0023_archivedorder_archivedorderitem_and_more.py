@@ -0,0 +1,54 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+        ('restaurant', '0022_order_restaurant__system__dcb336_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('customer_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('table_number', models.CharField(blank=True, max_length=10, null=True)),
+                ('waiter_id', models.BigIntegerField(blank=True, null=True)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('delivery_address', models.TextField(blank=True, null=True)),
+                ('customer_phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('order_type', models.CharField(choices=[('in_house', 'In-House'), ('delivery', 'Delivery')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('served', 'Served'), ('out_for_delivery', 'Out for Delivery'), ('completed', 'Completed'), ('canceled', 'Canceled')], max_length=20)),
+                ('amount_paid', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('payment_method', models.CharField(blank=True, max_length=20, null=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='core.system')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('menu_item_id', models.BigIntegerField(blank=True, null=True)),
+                ('menu_item_name', models.CharField(max_length=100)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('unit_discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('line_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='restaurant.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['system', 'created_at'], name='restaurant__system__987fb4_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:16
+
+from django.db import migrations, models
+
+
+def backfill_list_prices(apps, schema_editor):
+    OrderItem = apps.get_model('restaurant', 'OrderItem')
+    MenuItem = apps.get_model('restaurant', 'MenuItem')
+
+    # The menu price at sale time was never stored; the current one is the best estimate
+    OrderItem.objects.filter(unit_list_price__isnull=True).update(
+        unit_list_price=models.Subquery(
+            MenuItem.objects.filter(pk=models.OuterRef('menu_item_id')).values('price')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0023_archivedorder_archivedorderitem_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_list_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_list_prices, migrations.RunPython.noop),
+    ]
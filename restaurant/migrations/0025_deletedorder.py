@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_sequencecounter'),
+        ('restaurant', '0024_orderitem_unit_list_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_orders', to='core.system')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['system', 'deleted_at'], name='restaurant__system__7e5f0a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0025_deletedorder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryDeduction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deductions', to='restaurant.inventoryitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_deductions', to='restaurant.order')),
+            ],
+            options={
+                'unique_together': {('order', 'inventory_item')},
+            },
+        ),
+    ]
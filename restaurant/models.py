@@ -1,16 +1,24 @@
-from django.db import models
-from core.models import System , BaseMultiTenantModel 
-from django.contrib.auth.models import User 
-from core.models import Employee
+from django.db import models, transaction, IntegrityError
+from core.models import System , BaseMultiTenantModel, PublicSliderImage
+from django.contrib.auth.models import User
+from core.models import Employee, DailySalesRollup, ResourceVersion
+from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models.signals import pre_delete, post_save
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import F, Sum
+from decimal import Decimal
+from .cache import invalidate_public_menu
 # Add Cloudinary imports
 import cloudinary
 import cloudinary.uploader
 
+CENT = Decimal("0.01")
+MONEY = models.DecimalField(max_digits=12, decimal_places=2)
+
+
 class MenuItem(BaseMultiTenantModel):
     """Menu for restaurants and cafes"""
     DEFAULT_CATEGORIES = [
@@ -100,6 +108,38 @@ def update_menu_item_image(sender, instance, **kwargs):
         except sender.DoesNotExist:
             pass
 
+@receiver([post_save, post_delete], sender=MenuItem)
+def bump_menu_version(sender, instance, **kwargs):
+    # Order lists show menu item names, so they change too
+    ResourceVersion.bump(instance.system_id, "menu", "orders")
+
+
+# Public menu cache invalidation
+
+def system_subdomain(system_id):
+    return System.objects.filter(pk=system_id).values_list("subdomain", flat=True).first()
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=PublicSliderImage)
+def invalidate_menu_cache_for_system(sender, instance, **kwargs):
+    invalidate_public_menu(system_subdomain(instance.system_id))
+
+@receiver(pre_save, sender=System)
+def remember_system_subdomain(sender, instance, **kwargs):
+    # The subdomain may be changing; the cache entry under the old one must go too
+    instance._previous_subdomain = system_subdomain(instance.pk) if instance.pk else None
+
+@receiver([post_save, post_delete], sender=System)
+def invalidate_menu_cache_for_system_change(sender, instance, **kwargs):
+    invalidate_public_menu(instance.subdomain, getattr(instance, "_previous_subdomain", None))
+
+
+
+class TableOccupiedError(ValidationError):
+    def __init__(self, table_number, order_id=None):
+        self.table_number = table_number
+        self.order_id = order_id
+        super().__init__(f"Table {table_number} is already occupied by order #{order_id}")
 
 
 # The whole receipt (one per customer).
@@ -138,18 +178,174 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs the ?since= delta sync used by kitchen, waiter and delivery screens
+            models.Index(fields=["system", "updated_at"]),
+            # Backs created_at range queries (dashboards, exports, history lists)
+            models.Index(fields=["system", "created_at"]),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        # Remember the stored status and occupied table so save() can detect transitions
+        instance._loaded_status = loaded.get("status")
+        occupied = loaded.get("order_type") == "in_house" and loaded.get("status") in TableState.ACTIVE_STATUSES
+        instance._loaded_table = loaded.get("table_number") if occupied else None
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous_status = getattr(self, "_loaded_status", None)
+        created = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if (previous_status == "completed") != (self.status == "completed"):
+                # Entering "completed" adds the order to the daily rollup and consumes
+                # its ingredients; leaving it reverses both
+                sign = 1 if self.status == "completed" else -1
+                self.record_daily_rollup(sign)
+                self.deduct_ingredients(sign)
+            if created:
+                OrderEvent.objects.create(system_id=self.system_id, order=self, event_type="created", status=self.status)
+            elif previous_status != self.status:
+                OrderEvent.objects.create(system_id=self.system_id, order=self, event_type="status_changed", status=self.status)
+            self.sync_table_state(created)
+        self._loaded_status = self.status
+        self._loaded_table = self.table_number if self.occupies_table() else None
+
+    def occupies_table(self):
+        return (
+            self.order_type == "in_house"
+            and bool(self.table_number)
+            and self.status in TableState.ACTIVE_STATUSES
+        )
+
+    def sync_table_state(self, created=False):
+        """
+        Keep TableState in step with this order, inside the caller's transaction.
+        The (system, table_number) unique constraint makes claiming a table race-free:
+        a second active order on the same table fails with TableOccupiedError.
+        A table is only claimed when the order is created, moves to another table or
+        becomes active again, so double bookings made before TableState existed do not
+        block unrelated updates.
+        """
+        occupies = self.occupies_table()
+        if not created:
+            # Release a table this order left (finished, canceled or moved to another table)
+            released = TableState.objects.filter(order=self)
+            if occupies:
+                released = released.exclude(table_number=self.table_number)
+            released.delete()
+        if not occupies:
+            return
+
+        waiter_name = self.waiter.user.username if self.waiter and self.waiter.user else None
+        if TableState.objects.filter(order=self).update(
+            status=self.status, waiter_name=waiter_name, updated_at=timezone.now()
+        ):
+            return
+        if not created and getattr(self, "_loaded_table", None) == self.table_number:
+            # Already seated here without holding the table: a pre-existing double booking
+            return
+        try:
+            with transaction.atomic():
+                TableState.objects.create(
+                    system_id=self.system_id,
+                    table_number=self.table_number,
+                    order=self,
+                    status=self.status,
+                    waiter_name=waiter_name,
+                )
+        except IntegrityError:
+            occupant = TableState.objects.filter(
+                system_id=self.system_id, table_number=self.table_number
+            ).values_list("order_id", flat=True).first()
+            raise TableOccupiedError(self.table_number, occupant)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if getattr(self, "_loaded_status", None) == "completed":
+                self.record_daily_rollup(-1)
+            DeletedOrder.objects.create(system_id=self.system_id, order_id=self.pk)
+            return super().delete(*args, **kwargs)
+
+    def record_daily_rollup(self, sign, items=None):
+        """
+        Add (sign=1) or remove (sign=-1) this order's totals from its business day's rollup.
+        With `items`, only those lines are counted and the order count is left alone.
+        """
+        lines = self.order_items.all() if items is None else items
+        totals = lines.aggregate(
+            revenue=Sum("line_total"),
+            cost=Sum(F("unit_cost") * F("quantity"), output_field=MONEY),
+            discount=Sum((F("unit_list_price") - F("unit_price")) * F("quantity"), output_field=MONEY),
+        )
+        revenue = totals["revenue"] or 0
+        cost = totals["cost"] or 0
+        DailySalesRollup.record(
+            self.system_id,
+            timezone.localdate(self.created_at),
+            orders=sign if items is None else 0,
+            revenue=sign * revenue,
+            cost=sign * cost,
+            profit=sign * (revenue - cost),
+            discount=sign * (totals["discount"] or 0),
+        )
+
+    def deduct_ingredients(self, sign=1):
+        """
+        Take (sign=1) the recipe ingredients of this order's items, never going below
+        zero, and record what was actually taken; give back (sign=-1) exactly that.
+        """
+        now = timezone.now()
+        if sign < 0:
+            for inventory_item_id, quantity in self.inventory_deductions.values_list("inventory_item_id", "quantity"):
+                InventoryItem.objects.filter(pk=inventory_item_id).update(
+                    quantity=F("quantity") + quantity, updated_at=now
+                )
+            self.inventory_deductions.all().delete()
+            return
+
+        needed = dict(
+            RecipeIngredient.objects.filter(menu_item__orderitem__order=self)
+            .values("inventory_item_id")
+            .annotate(total=Sum(F("quantity") * F("menu_item__orderitem__quantity")))
+            .order_by("inventory_item_id")
+            .values_list("inventory_item_id", "total")
+        )
+        if not needed:
+            return
+        # Lock in id order so concurrent completions cannot deadlock or over-deduct
+        in_stock = (
+            InventoryItem.objects.select_for_update()
+            .filter(pk__in=needed)
+            .order_by("pk")
+            .values_list("pk", "quantity")
+        )
+        deductions = []
+        for inventory_item_id, available in in_stock:
+            taken = min(available, needed[inventory_item_id])
+            if not taken:
+                continue
+            InventoryItem.objects.filter(pk=inventory_item_id).update(
+                quantity=F("quantity") - taken, updated_at=now
+            )
+            deductions.append(InventoryDeduction(order=self, inventory_item_id=inventory_item_id, quantity=taken))
+        InventoryDeduction.objects.bulk_create(deductions)
+
     def update_total_price(self):
-        """Recalculate total price based on OrderItems."""
-        self.total_price = sum(item.total_price() for item in self.order_items.all())
+        """Recalculate total price from the snapshotted OrderItem line totals."""
+        self.total_price = self.order_items.aggregate(total=Sum("line_total"))["total"] or 0
         self.save()
-    
-    
+
+
     def calculate_profit(self):
         """Calculate total profit from all order items, after discount."""
-        return sum(
-            (item.menu_item.get_discounted_price() - item.menu_item.cost) * item.quantity
-            for item in self.order_items.all()
-        )
+        return self.order_items.aggregate(
+            profit=Sum((F("unit_price") - F("unit_cost")) * F("quantity"), output_field=MONEY)
+        )["profit"] or 0
 
 
     # def calculate_profit(self):
@@ -167,11 +363,48 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="order_items", on_delete=models.CASCADE)
     menu_item = models.ForeignKey("MenuItem", on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Prices are copied from the menu item when the line is created, so later menu
+    # edits never rewrite order history and reports need no join back to MenuItem.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Menu price before discount, so the rollup discount is reversed exactly as it was recorded
+    unit_list_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    def snapshot_prices(self):
+        """Copy the list price, discounted price and cost from the menu item (once) and compute the line total."""
+        if self.unit_list_price is None:
+            self.unit_list_price = self.menu_item.price
+        if self.unit_price is None:
+            self.unit_price = Decimal(self.menu_item.get_discounted_price()).quantize(CENT)
+        if self.unit_cost is None:
+            self.unit_cost = self.menu_item.cost
+        self.line_total = self.unit_price * self.quantity
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.snapshot_prices()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self.record_daily_rollup(1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.record_daily_rollup(-1)
+            return super().delete(*args, **kwargs)
+
+    def record_daily_rollup(self, sign):
+        """Lines added to or removed from an already completed order move its rollup with them."""
+        order = Order.objects.filter(pk=self.order_id, status="completed").first()
+        if order is not None:
+            order.record_daily_rollup(sign, items=OrderItem.objects.filter(pk=self.pk))
 
     def total_price(self):
-        """Calculate total price for this order item, applying discount if any."""
-        unit_price = self.menu_item.get_discounted_price()
-        return unit_price * self.quantity
+        """Total price for this order item, using the price snapshotted at order time."""
+        if self.line_total is None:
+            self.snapshot_prices()
+        return self.line_total
 
     # def total_price(self):
     #     """Calculate total price for this order item."""
@@ -185,6 +418,72 @@ class OrderItem(models.Model):
 
     
     
+@receiver([post_save, post_delete], sender=Order)
+def bump_order_version(sender, instance, **kwargs):
+    ResourceVersion.bump(instance.system_id, "orders")
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def bump_order_item_version(sender, instance, **kwargs):
+    system_id = Order.objects.filter(pk=instance.order_id).values_list("system_id", flat=True).first()
+    if system_id:
+        ResourceVersion.bump(system_id, "orders")
+
+
+class TableState(models.Model):
+    """
+    One row per occupied table, maintained by Order.save in the same transaction.
+    Table views read this instead of scanning active orders.
+    """
+    ACTIVE_STATUSES = ["pending", "preparing", "ready", "served"]
+
+    system = models.ForeignKey(System, on_delete=models.CASCADE, related_name="table_states")
+    table_number = models.CharField(max_length=10)
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="table_state")
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    waiter_name = models.CharField(max_length=150, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("system", "table_number")
+
+    def __str__(self):
+        return f"Table {self.table_number} - order {self.order_id} ({self.status})"
+
+
+class OrderEvent(models.Model):
+    """Append-only log of order changes; the id doubles as the SSE event id (Last-Event-ID)."""
+    EVENT_TYPE_CHOICES = [
+        ("created", "Created"),
+        ("status_changed", "Status Changed"),
+    ]
+
+    system = models.ForeignKey(System, on_delete=models.CASCADE, related_name="order_events")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="events")
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["system", "id"])]
+
+    def __str__(self):
+        return f"Order {self.order_id} {self.event_type} ({self.status})"
+
+
+class DeletedOrder(models.Model):
+    """Tombstone left by Order.delete, so delta sync can report the order as removed."""
+    system = models.ForeignKey(System, on_delete=models.CASCADE, related_name="deleted_orders")
+    order_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["system", "deleted_at"])]
+
+    def __str__(self):
+        return f"Deleted order {self.order_id}"
+
+
 class Payment(BaseMultiTenantModel):
     system = models.ForeignKey(System, on_delete=models.CASCADE)  # Ensure payment is tied to a specific restaurant
     order = models.OneToOneField(Order, on_delete=models.CASCADE)
@@ -202,6 +501,51 @@ class Payment(BaseMultiTenantModel):
 
 
 
+class ArchivedOrder(models.Model):
+    """
+    Completed/canceled orders moved out of the hot Order table by
+    `manage.py archive_history`. Keeps the original id; payment is folded in.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    system = models.ForeignKey(System, on_delete=models.CASCADE, related_name="archived_orders")
+    customer_name = models.CharField(max_length=100, blank=True, null=True)
+    table_number = models.CharField(max_length=10, blank=True, null=True)
+    waiter_id = models.BigIntegerField(null=True, blank=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    delivery_address = models.TextField(blank=True, null=True)
+    customer_phone = models.CharField(max_length=20, blank=True, null=True)
+    order_type = models.CharField(max_length=20, choices=Order.ORDER_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    payment_method = models.CharField(max_length=20, null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["system", "created_at"])]
+
+    def __str__(self):
+        return f"Archived order {self.id} ({self.status})"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name="order_items")
+    menu_item_id = models.BigIntegerField(null=True, blank=True)
+    menu_item_name = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    # Menu price minus the charged price at archiving time, so rollup rebuilds need no MenuItem
+    unit_discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item_name} in archived order {self.order_id}"
+
+
 class InventoryItem(models.Model):
     system = models.ForeignKey(System, on_delete=models.CASCADE, related_name='inventory_items')
     name = models.CharField(max_length=255)
@@ -211,9 +555,47 @@ class InventoryItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs the low-stock query
+            models.Index(fields=["system", "min_threshold"]),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.system.name}"
 
+    @classmethod
+    def low_stock(cls, system):
+        """Items at or below their minimum threshold."""
+        return cls.objects.filter(
+            system=system, min_threshold__isnull=False, quantity__lte=F("min_threshold")
+        )
+
+
+class RecipeIngredient(models.Model):
+    """How much of an inventory item one unit of a menu item uses."""
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="recipe_ingredients")
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name="recipe_uses")
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+
+    class Meta:
+        unique_together = ("menu_item", "inventory_item")
+
+    def __str__(self):
+        return f"{self.quantity} x {self.inventory_item.name} for {self.menu_item.name}"
+
+class InventoryDeduction(models.Model):
+    """What completing an order took from one inventory item, given back if the order is reopened."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="inventory_deductions")
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE, related_name="deductions")
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("order", "inventory_item")
+
+    def __str__(self):
+        return f"{self.quantity} x {self.inventory_item_id} for order {self.order_id}"
+
 # class Staff(BaseMultiTenantModel):
 #     """Each system (restaurant) has its own staff"""
 #     system = models.ForeignKey(System, on_delete=models.CASCADE)
@@ -233,6 +615,10 @@ class RestaurantData(models.Model):
             raise ValidationError("RestaurantData can only be associated with restaurant systems")
         super().save(*args, **kwargs)
 
+@receiver([post_save, post_delete], sender=RestaurantData)
+def bump_tables_version(sender, instance, **kwargs):
+    ResourceVersion.bump(instance.system_id, "tables")
+
 @receiver(post_save, sender=System)
 def create_restaurant_data(sender, instance, created, **kwargs):
     if created and instance.category == 'restaurant':
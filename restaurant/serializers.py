@@ -3,13 +3,14 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from .models import MenuItem
 from .models import Order, OrderItem
-from .models import InventoryItem
+from .models import InventoryItem, RecipeIngredient
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from .models import RestaurantData
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.files.base import ContentFile
-import requests
-import os
+from .menu_import import fetch_image
 
 from rest_framework.exceptions import NotFound, PermissionDenied
 
@@ -73,12 +74,8 @@ class MenuItemSerializer(serializers.ModelSerializer):
 
     def _fetch_and_save_image(self, instance, image_url):
         try:
-            response = requests.get(image_url)
-            response.raise_for_status()
-            file_name = os.path.basename(image_url.split("?")[0])
-            if not file_name:
-                file_name = "menuitem_image.jpg"
-            instance.image.save(file_name, ContentFile(response.content), save=True)
+            file_name, content = fetch_image(image_url)
+            instance.image.save(file_name, content, save=True)
         except Exception as e:
             raise serializers.ValidationError({"image_url": f"Failed to fetch image: {e}"})
 
@@ -115,16 +112,32 @@ class MenuItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Category cannot be empty")
         return value
 
+class MenuItemPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves menu items from `context["menu_items"]` (id -> MenuItem) when the parent
+    serializer has loaded them in one query, instead of one query per item.
+    """
+
+    def to_internal_value(self, data):
+        menu_items = self.context.get("menu_items")
+        if menu_items is None:
+            return super().to_internal_value(data)
+        try:
+            return menu_items[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail("does_not_exist", pk_value=data)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     menu_item_name = serializers.ReadOnlyField(source="menu_item.name")
-    menu_item = serializers.PrimaryKeyRelatedField(
+    menu_item = MenuItemPrimaryKeyField(
         queryset=MenuItem.objects.all()
     )
 
     class Meta:
         model = OrderItem
-        fields = ["id", "menu_item", "menu_item_name", "quantity"]
-        read_only_fields = ["id", "menu_item_name"]
+        fields = ["id", "menu_item", "menu_item_name", "quantity", "unit_price", "line_total"]
+        read_only_fields = ["id", "menu_item_name", "unit_price", "line_total"]
     
    
     
@@ -132,7 +145,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return data
 
 class OrderSerializer(serializers.ModelSerializer):
-    order_items = OrderItemSerializer(many=True, read_only=True)
+    order_items = OrderItemSerializer(many=True, required=False)
     waiter = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.filter(role="waiter"), allow_null=True, required=False)
     order_type = serializers.ChoiceField(
         choices=Order.ORDER_TYPE_CHOICES,
@@ -153,12 +166,57 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "total_price", "created_at", "updated_at", "system"]
 
+    def to_internal_value(self, data):
+        items = data.get("order_items") if hasattr(data, "get") else None
+        if isinstance(items, list) and "menu_items" not in self.context:
+            # Load every referenced menu item of this system in one query
+            system_id = self.context["view"].kwargs.get("system_id")
+            ids = set()
+            for item in items:
+                try:
+                    ids.add(int(item.get("menu_item")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context["menu_items"] = MenuItem.objects.filter(system_id=system_id, id__in=ids).in_bulk()
+        return super().to_internal_value(data)
+
     def create(self, validated_data):
         request = self.context["request"]
         system_id = self.context["view"].kwargs.get("system_id")
         system = get_object_or_404(System, id=system_id)
         validated_data["system"] = system
-        return super().create(validated_data)
+        items_data = validated_data.pop("order_items", [])
+
+        lines = [OrderItem(menu_item=item["menu_item"], quantity=item.get("quantity", 1)) for item in items_data]
+        for line in lines:
+            line.snapshot_prices()
+        if lines:
+            validated_data["total_price"] = sum(line.line_total for line in lines)
+
+        # An order created as completed is saved as pending first so the daily
+        # rollup is recorded once its items exist.
+        final_status = validated_data.get("status")
+        if final_status == "completed":
+            validated_data["status"] = "pending"
+
+        with transaction.atomic():
+            order = super().create(validated_data)
+            for line in lines:
+                line.order = order
+            OrderItem.objects.bulk_create(lines)
+            if final_status == "completed":
+                order.status = final_status
+                order.save()
+
+        prefetch_related_objects([order], "order_items__menu_item")
+        return order
+
+    def update(self, instance, validated_data):
+        if "order_items" in validated_data:
+            raise serializers.ValidationError(
+                {"order_items": "Items of an existing order are changed through the order items endpoint."}
+            )
+        return super().update(instance, validated_data)
     
     def validate(self, data):
         request = self.context["request"]
@@ -202,6 +260,22 @@ class InventoryItemSerializer(serializers.ModelSerializer):
             'min_threshold': {'required': False, 'allow_null': True},
         }
 
+class RecipeIngredientSerializer(serializers.ModelSerializer):
+    inventory_item = serializers.PrimaryKeyRelatedField(queryset=InventoryItem.objects.all())
+    inventory_item_name = serializers.ReadOnlyField(source="inventory_item.name")
+    unit = serializers.ReadOnlyField(source="inventory_item.unit")
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ["id", "inventory_item", "inventory_item_name", "unit", "quantity"]
+        read_only_fields = ["id", "inventory_item_name", "unit"]
+
+    def validate_inventory_item(self, value):
+        system_id = self.context["view"].kwargs.get("system_id")
+        if str(value.system_id) != str(system_id):
+            raise serializers.ValidationError("Inventory item doesn't belong to this system")
+        return value
+
 class PublicMenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuItem
@@ -24,6 +24,8 @@ router.register(
 
 # API URLs
 api_urlpatterns = [
+    # Must precede the router so "stream" is not taken as a kitchen order pk
+    path('<int:system_id>/kitchen/orders/stream/', KitchenOrderStreamView.as_view(), name='kitchen-orders-stream'),
     path('', include(router.urls)),
     path('systems/<int:system_id>/restaurant-data/', RestaurantDataAPIView.as_view(), name='restaurant-data'),
     path('<int:system_id>/inventory/', InventoryItemViewSet.as_view({
@@ -31,6 +33,10 @@ api_urlpatterns = [
         'post': 'create',
     }), name='inventory-list-create'),
     
+    path('<int:system_id>/inventory/low-stock/', InventoryItemViewSet.as_view({
+        'get': 'low_stock',
+    }), name='inventory-low-stock'),
+
     path('<int:system_id>/inventory/<int:pk>/', InventoryItemViewSet.as_view({
         'get': 'retrieve',
         'put': 'update',
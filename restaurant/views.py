@@ -8,7 +8,8 @@ from .models import MenuItem
 from .serializers import MenuItemSerializer, OrderSerializer, OrderItemSerializer
 from rest_framework.exceptions import PermissionDenied, MethodNotAllowed, ValidationError
 from rest_framework import permissions
-from .serializers import InventoryItemSerializer
+from .serializers import InventoryItemSerializer, RecipeIngredientSerializer
+from django.db import transaction
 from rest_framework.exceptions import NotFound
 from .models import System
 from core.models import Employee
@@ -22,8 +23,19 @@ import logging
 from core.serializers import PublicSystemSerializer 
 from .serializers import RestaurantDataSerializer
 import csv
+from contextlib import contextmanager
 from django.http import HttpResponse
 from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from core.authentication import QueryParamJWTAuthentication
+from core.conditional import ConditionalListMixin
+from core.exports import EXPORT_CHUNK_SIZE, stream_csv
+from .menu_import import MAX_IMPORT_ROWS, import_menu_items, parse_import_rows
+from .events import order_event_stream
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
 
 # Define a custom exception for table conflicts
 class TableConflict(APIException):
@@ -34,9 +46,19 @@ class TableConflict(APIException):
 logger = logging.getLogger(__name__)
 
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+@contextmanager
+def raise_table_conflict():
+    """Turn a TableOccupiedError from Order.save into a 409 response."""
+    try:
+        yield
+    except TableOccupiedError as exc:
+        raise TableConflict(detail=exc.message)
+
+
+class MenuItemViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = MenuItemSerializer
     permission_classes = [IsAuthenticated]
+    etag_resources = ("menu",)
 
     def get_queryset(self):
         """Filter menu items based on the requested system_id and optional category."""
@@ -62,8 +84,72 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         )
         return Response(list(filter(None, categories)))
 
+    @action(detail=False, methods=["post"], url_path="bulk-import")
+    def bulk_import(self, request, *args, **kwargs):
+        """
+        Import many menu items at once from a JSON list or an uploaded CSV `file`.
+        Rows are validated like single creates, inserted with one bulk_create, and
+        their `image_url`s fetched concurrently. Returns a per-row report.
+        """
+        # Same ownership check as MenuItemSerializer.create
+        system = System.objects.filter(id=self.kwargs.get("system_id"), owner=request.user).first()
+        if system is None:
+            raise ValidationError("Invalid system or unauthorized access.")
+        rows = parse_import_rows(request)
+        if rows is None:
+            return Response(
+                {"error": "Send a JSON list of menu items or a CSV file named 'file'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not rows:
+            return Response({"error": "No rows to import."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response(
+                {"error": f"At most {MAX_IMPORT_ROWS} rows can be imported at once."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        report = import_menu_items(system, rows, self.get_serializer_class(), self.get_serializer_context())
+        created = sum(1 for entry in report if entry["status"] == "created")
+        return Response(
+            {"created": created, "failed": len(report) - created, "results": report},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=True, methods=["get", "put"])
+    def recipe(self, request, *args, **kwargs):
+        """
+        GET: the ingredients one unit of this menu item consumes.
+        PUT: replace them with a list of {"inventory_item": id, "quantity": n}.
+        Completing an order deducts these from inventory.
+        """
+        menu_item = self.get_object()
+        if request.method == "GET":
+            ingredients = menu_item.recipe_ingredients.select_related("inventory_item")
+            return Response(RecipeIngredientSerializer(ingredients, many=True).data)
+
+        serializer = RecipeIngredientSerializer(
+            data=request.data, many=True, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        item_ids = [row["inventory_item"].id for row in serializer.validated_data]
+        if len(item_ids) != len(set(item_ids)):
+            raise ValidationError({"inventory_item": "Each inventory item may appear only once."})
+
+        with transaction.atomic():
+            menu_item.recipe_ingredients.all().delete()
+            ingredients = RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(menu_item=menu_item, **row) for row in serializer.validated_data
+            ])
+        return Response(RecipeIngredientSerializer(ingredients, many=True).data)
+
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action == "recipe" and self.request.method != "GET":
+            return [
+                IsAuthenticated(),
+                OR(IsSystemOwner(), IsEmployeeRolePermission("manager", "head_chef")),
+            ]
+        if self.action in ["create", "update", "partial_update", "destroy", "bulk_import"]:
             return [
                 IsAuthenticated(),
                 OR(IsSystemOwner(), IsEmployeeRolePermission("manager", "head_chef")),
@@ -81,27 +167,23 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         if export == 'csv':
             # Define the fields you want to export
             fieldnames = ['id', 'name', 'price', 'category', 'is_available', 'image']
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="menu_items.csv"'
-            writer = csv.writer(response)
-            writer.writerow(fieldnames)
-            for item in queryset:
-                writer.writerow([getattr(item, f) for f in fieldnames])
-            return response
+            rows = queryset.order_by('id').values_list(*fieldnames).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+            return stream_csv('menu_items.csv', fieldnames, rows)
 
         return super().list(request, *args, **kwargs)
 
 # pagination.py
 
 
-from core.pagination import CustomPagination
+from core.pagination import CustomPagination, CreatedAtCursorPagination
 
 
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     pagination_class = CustomPagination  # Add custom pagination here
+    etag_resources = ("orders",)
 
     def get_queryset(self):
         """Filter orders by the requested system, ordered by most recent."""
@@ -109,13 +191,48 @@ class OrderViewSet(viewsets.ModelViewSet):
         system = get_object_or_404(System, id=system_id)
         return Order.objects.filter(system=system).order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('export') == 'csv':
+            return self.export_csv(request)
+        return super().list(request, *args, **kwargs)
+
+    def export_csv(self, request):
+        """Stream orders as CSV, optionally limited to ?start_date= / ?end_date= (YYYY-MM-DD, inclusive)."""
+        queryset = self.get_queryset()
+        try:
+            start_date = request.query_params.get('start_date')
+            end_date = request.query_params.get('end_date')
+            # Plain created_at bounds, so the (system, created_at) index serves the range
+            if start_date:
+                queryset = queryset.filter(
+                    created_at__gte=day_start(datetime.strptime(start_date, "%Y-%m-%d").date())
+                )
+            if end_date:
+                queryset = queryset.filter(
+                    created_at__lt=day_start(datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1))
+                )
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        header = [
+            'id', 'created_at', 'status', 'order_type', 'table_number',
+            'customer_name', 'customer_phone', 'waiter', 'total_price',
+        ]
+        rows = queryset.values_list(
+            'id', 'created_at', 'status', 'order_type', 'table_number',
+            'customer_name', 'customer_phone', 'waiter__name', 'total_price',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return stream_csv('orders.csv', header, rows)
+
     def perform_create(self, serializer):
         """Link order to correct system and check table availability."""
         system_id = self.kwargs.get("system_id")
         system = get_object_or_404(System, id=system_id)
         
-        # Get the table number and order type from the request data
-        table_number = serializer.validated_data.get('table_number')
+        # Get the order type from the request data
         order_type = serializer.validated_data.get('order_type', 'in_house')
         
         # Check delivery requirements for delivery orders
@@ -128,21 +245,9 @@ class OrderViewSet(viewsets.ModelViewSet):
             if not customer_phone:
                 raise ValidationError("Customer phone number is required for delivery orders")
         
-        # Check table availability for in-house orders
-        if order_type == 'in_house' and table_number:
-            # Check if there's an active order on this table
-            active_order = Order.objects.filter(
-                system=system,
-                table_number=table_number,
-                order_type='in_house',
-                status__in=['pending', 'preparing', 'ready', 'served']
-            ).first()
-            
-            if active_order:
-                raise TableConflict(detail=f"Table {table_number} is already occupied by order #{active_order.id}")
-        
-        # If all validations pass, save the order
-        serializer.save(system=system)
+        # Table availability is enforced by the TableState unique constraint when the order is saved
+        with raise_table_conflict():
+            serializer.save(system=system)
 
     def perform_update(self, serializer):
         """Restrict update fields for waiters."""
@@ -166,7 +271,8 @@ class OrderViewSet(viewsets.ModelViewSet):
                     "You do not have permission to update this order."
                 )
 
-        serializer.save()
+        with raise_table_conflict():
+            serializer.save()
 
     def get_permissions(self):
         """
@@ -222,8 +328,9 @@ class OrderItemViewSet(viewsets.ModelViewSet):
         if menu_item.system_id != system_id:
             raise PermissionDenied("Menu item doesn't belong to this system")
 
-        serializer.save(order=order)
-        order.update_total_price()
+        with raise_table_conflict():
+            serializer.save(order=order)
+            order.update_total_price()
 
     def create(self, request, *args, **kwargs):
         """Optimized bulk creation with system validation"""
@@ -247,12 +354,20 @@ class OrderItemViewSet(viewsets.ModelViewSet):
                     )
 
             # Save all items
-            items = serializer.save(order=order)
-            order.update_total_price()
+            with raise_table_conflict():
+                serializer.save(order=order)
+                order.update_total_price()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return super().create(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        order = instance.order
+        with raise_table_conflict():
+            instance.delete()
+            # Keep the total (and updated_at, which delta sync relies on) current
+            order.update_total_price()
+
     def get_permissions(self):
         """
         Role-based access control for order item actions:
@@ -272,7 +387,54 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     # add kitchen order By Ali
 
 
-class KitchenOrderViewSet(viewsets.ModelViewSet):
+class OrderDeltaSyncMixin:
+    """
+    Delta sync for order display screens.
+
+    Without `?since=` the list is returned as before, with an `X-Sync-Cursor` header.
+    With `?since=<cursor>` only orders touched after the cursor are returned:
+    `changed` holds those still in the view's queryset, `removed` the ids of those
+    that left it or were deleted. Cursors are epoch milliseconds; a small overlap window covers
+    transactions that committed late, so clients should upsert by id.
+    """
+    sync_overlap = timedelta(seconds=2)
+
+    def parse_sync_cursor(self, value):
+        try:
+            millis = int(value)
+            return datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc) - self.sync_overlap
+        except (TypeError, ValueError, OverflowError, OSError):
+            # Out-of-range timestamps fail in fromtimestamp (or the overlap subtraction)
+            raise ValidationError({"since": "Invalid cursor"})
+
+    def sync_response(self, queryset):
+        cursor = int(timezone.now().timestamp() * 1000)
+        since = self.request.query_params.get("since")
+
+        if since is None:
+            response = Response(self.get_serializer(queryset, many=True).data)
+            response["X-Sync-Cursor"] = str(cursor)
+            return response
+
+        since = self.parse_sync_cursor(since)
+        system_id = self.kwargs.get("system_id")
+        changed = queryset.filter(updated_at__gte=since)
+        removed = (
+            Order.objects.filter(system_id=system_id, updated_at__gte=since)
+            .exclude(pk__in=queryset.values("pk"))
+            .values_list("id", flat=True)
+        )
+        deleted = DeletedOrder.objects.filter(system_id=system_id, deleted_at__gte=since).values_list(
+            "order_id", flat=True
+        )
+        return Response({
+            "cursor": str(cursor),
+            "changed": self.get_serializer(changed, many=True).data,
+            "removed": [*removed, *deleted],
+        })
+
+
+class KitchenOrderViewSet(OrderDeltaSyncMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ["get", "patch", "head", "options"]
@@ -296,7 +458,10 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
         system = get_object_or_404(System, id=system_id)
         return Order.objects.filter(
             system=system, status__in=["pending", "preparing"]
-        ).order_by("created_at")
+        ).order_by("created_at").prefetch_related("order_items__menu_item")
+
+    def list(self, request, *args, **kwargs):
+        return self.sync_response(self.get_queryset())
 
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -309,11 +474,59 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
             )
 
         instance.status = new_status
-        instance.save()
+        with raise_table_conflict():
+            instance.save()
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class KitchenOrderStreamView(APIView):
+    """
+    Server-Sent Events stream of order-created and status-changed events for one system.
+
+    Replaces polling of the kitchen order list: clients load the list once, then apply
+    events from this stream. Resume with the standard `Last-Event-ID` header (sent by
+    EventSource on reconnect) or `?last_event_id=`. Since EventSource cannot send headers,
+    the JWT access token may be passed as `?token=`.
+
+    Only served under ASGI (the Procfile runs `automation_system.asgi` with uvicorn
+    workers; locally, `uvicorn automation_system.asgi:application`). A WSGI server or
+    `runserver` would consume the stream synchronously and hold a worker for its whole
+    lifetime, so those requests get a 501. Streams of one system share a single poller
+    per worker (see `SystemEventPoller`).
+    """
+    authentication_classes = [QueryParamJWTAuthentication]
+
+    def get_permissions(self):
+        # Same roles as the kitchen order list it replaces
+        return [
+            IsAuthenticated(),
+            OR(IsSystemOwner(), IsEmployeeRolePermission("chef", "manager", "head_chef")),
+        ]
+
+    def get(self, request, system_id):
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {"error": "The order stream requires an ASGI server."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        get_object_or_404(System, id=system_id)
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return Response({"error": "Invalid Last-Event-ID"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            order_event_stream(system_id, last_event_id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 class InventoryItemViewSet(viewsets.ModelViewSet):
     serializer_class = InventoryItemSerializer
     permission_classes = [IsAuthenticated]
@@ -335,6 +548,12 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         instance.delete()
 
+    def low_stock(self, request, *args, **kwargs):
+        """Inventory items at or below their minimum threshold."""
+        system = get_object_or_404(System, id=self.kwargs.get("system_id"))
+        serializer = self.get_serializer(InventoryItem.low_stock(system).order_by("name"), many=True)
+        return Response(serializer.data)
+
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
             return [
@@ -357,6 +576,8 @@ from collections import defaultdict
 from .models import Order, OrderItem, MenuItem
 from rest_framework.permissions import IsAuthenticated, OR
 from core.permissions import IsSystemOwner, IsEmployeeRolePermission
+from .analytics import profit_for_periods, profit_series
+from core.analytics import calendar_periods, count_for_periods, day_start
 
 
 class ProfitSummaryView(APIView):
@@ -373,7 +594,7 @@ class ProfitSummaryView(APIView):
 
         # If system was created today, only return today's data
         if system_created_date == today:
-            today_profit = self.calc_profit(system, today, today)
+            today_profit = profit_for_periods(system, {"today": (today, today)})["today"]
             return Response({
                 "day_profit": round(today_profit, 2),
                 "day_change": 0.0,  # No change since it's the first day
@@ -383,65 +604,49 @@ class ProfitSummaryView(APIView):
                 "month_change": 0.0,  # No change since it's the first month
             })
 
-        # Calculate yesterday's data only if system existed yesterday
+        # Collect every period first, then compute all of them in one aggregate query
         yesterday = today - timedelta(days=1)
-        today_profit = self.calc_profit(system, today, today)
+        periods = {"today": (today, today)}
         if yesterday >= system_created_date:
-            yesterday_profit = self.calc_profit(system, yesterday, yesterday)
-            day_change = self.percentage_change(today_profit, yesterday_profit)
-        else:
-            yesterday_profit = 0
-            day_change = 100.0 if today_profit > 0 else 0.0
+            periods["yesterday"] = (yesterday, yesterday)
 
-        # Calculate week's data
         week_start = today - timedelta(days=today.weekday())
         if week_start < system_created_date:
             week_start = system_created_date
         last_week_start = week_start - timedelta(days=7)
         last_week_end = week_start - timedelta(days=1)
-        
-        week_profit = self.calc_profit(system, week_start, today)
+        periods["week"] = (week_start, today)
         if last_week_start >= system_created_date:
-            last_week_profit = self.calc_profit(system, last_week_start, last_week_end)
-            week_change = self.percentage_change(week_profit, last_week_profit)
-        else:
-            last_week_profit = 0
-            week_change = 100.0 if week_profit > 0 else 0.0
+            periods["last_week"] = (last_week_start, last_week_end)
 
-        # Calculate month's data
         month_start = today.replace(day=1)
         if month_start < system_created_date:
             month_start = system_created_date
         last_month_end = month_start - timedelta(days=1)
         last_month_start = last_month_end.replace(day=1)
-        
-        month_profit = self.calc_profit(system, month_start, today)
+        periods["month"] = (month_start, today)
         if last_month_start >= system_created_date:
-            last_month_profit = self.calc_profit(system, last_month_start, last_month_end)
-            month_change = self.percentage_change(month_profit, last_month_profit)
-        else:
-            last_month_profit = 0
-            month_change = 100.0 if month_profit > 0 else 0.0
+            periods["last_month"] = (last_month_start, last_month_end)
+
+        profits = profit_for_periods(system, periods)
 
         return Response(
             {
-                "day_profit": round(today_profit, 2),
-                "day_change": day_change,
-                "week_profit": round(week_profit, 2),
-                "week_change": week_change,
-                "month_profit": round(month_profit, 2),
-                "month_change": month_change,
+                "day_profit": round(profits["today"], 2),
+                "day_change": self.period_change(profits, "today", "yesterday"),
+                "week_profit": round(profits["week"], 2),
+                "week_change": self.period_change(profits, "week", "last_week"),
+                "month_profit": round(profits["month"], 2),
+                "month_change": self.period_change(profits, "month", "last_month"),
             }
         )
 
-    def calc_profit(self, system, start_date, end_date):
-        orders = Order.objects.filter(
-            system=system,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
-            status="completed",
-        )
-        return sum(order.calculate_profit() for order in orders)
+    def period_change(self, profits, current_key, previous_key):
+        current = profits[current_key]
+        if previous_key not in profits:
+            # The system did not exist during the previous period
+            return 100.0 if current > 0 else 0.0
+        return self.percentage_change(current, profits[previous_key])
 
     def percentage_change(self, current, previous):
         if previous == 0:
@@ -467,51 +672,19 @@ class ProfitTrendView(APIView):
             # Get last 30 days of profit data, but not before system creation
             end_date = date.today()
             start_date = max(end_date - timedelta(days=29), system_created_date)
-
-            # Get all completed orders in the date range
-            orders = Order.objects.filter(
-                system=system,
-                created_at__date__gte=start_date,
-                created_at__date__lte=end_date,
-                status="completed",
-            )
-
-            # Group by date and calculate profit
-            daily_profits = defaultdict(Decimal)
-            for order in orders:
-                order_date = order.created_at.date()
-                daily_profits[order_date] += order.calculate_profit()
-
-            # Format response
-            response_data = [
-                {"date": str(date), "profit": float(round(profit, 2))}
-                for date, profit in sorted(daily_profits.items())
-            ]
-
         else:  # monthly view
             # Get last 12 months of profit data, but not before system creation
             end_date = date.today()
             start_date = max(end_date.replace(day=1) - timedelta(days=365), system_created_date)
 
-            # Get all completed orders in the date range
-            orders = Order.objects.filter(
-                system=system,
-                created_at__date__gte=start_date,
-                created_at__date__lte=end_date,
-                status="completed",
-            )
+        # Grouped by day or month in the database
+        profits = profit_series(system, start_date, end_date, "daily" if view == "daily" else "monthly")
 
-            # Group by month and calculate profit
-            monthly_profits = defaultdict(Decimal)
-            for order in orders:
-                month_key = order.created_at.date().replace(day=1)
-                monthly_profits[month_key] += order.calculate_profit()
-
-            # Format response
-            response_data = [
-                {"date": str(date), "profit": float(round(profit, 2))}
-                for date, profit in sorted(monthly_profits.items())
-            ]
+        # Format response
+        response_data = [
+            {"date": str(day), "profit": float(round(profit, 2))}
+            for day, profit in profits
+        ]
 
         return Response(response_data)
 
@@ -525,49 +698,24 @@ class OrderSummaryView(APIView):
 
     def get(self, request, system_id):
         system = get_object_or_404(System, id=system_id)
-        today = date.today()
-
-        # اليوم الحالي وأمس
-        yesterday = today - timedelta(days=1)
-        today_orders = self.count_orders(system, today, today)
-        yesterday_orders = self.count_orders(system, yesterday, yesterday)
-        today_change = self.percentage_change(today_orders, yesterday_orders)
-
-        # هذا الأسبوع والأسبوع السابق
-        week_start = today - timedelta(days=today.weekday())
-        last_week_start = week_start - timedelta(days=7)
-        last_week_end = week_start - timedelta(days=1)
-        week_orders = self.count_orders(system, week_start, today)
-        last_week_orders = self.count_orders(system, last_week_start, last_week_end)
-        week_change = self.percentage_change(week_orders, last_week_orders)
 
-        # هذا الشهر والشهر السابق
-        month_start = today.replace(day=1)
-        last_month_end = month_start - timedelta(days=1)
-        last_month_start = last_month_end.replace(day=1)
-        month_orders = self.count_orders(system, month_start, today)
-        last_month_orders = self.count_orders(system, last_month_start, last_month_end)
-        month_change = self.percentage_change(month_orders, last_month_orders)
+        # اليوم، هذا الأسبوع، هذا الشهر والفترات السابقة في استعلام واحد
+        counts = count_for_periods(
+            Order.objects.filter(system=system, status="completed"),
+            calendar_periods(date.today()),
+        )
 
         return Response(
             {
-                "today_orders": today_orders,
-                "today_change": today_change,
-                "week_orders": week_orders,
-                "week_change": week_change,
-                "month_orders": month_orders,
-                "month_change": month_change,
+                "today_orders": counts["today"],
+                "today_change": self.percentage_change(counts["today"], counts["yesterday"]),
+                "week_orders": counts["week"],
+                "week_change": self.percentage_change(counts["week"], counts["last_week"]),
+                "month_orders": counts["month"],
+                "month_change": self.percentage_change(counts["month"], counts["last_month"]),
             }
         )
 
-    def count_orders(self, system, start_date, end_date):
-        return Order.objects.filter(
-            system=system,
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date,
-            status="completed",
-        ).count()
-
     def percentage_change(self, current, previous):
         if previous == 0:
             if current == 0:
@@ -635,11 +783,9 @@ def restaurant_public_view(request, system):
     ).order_by('category', 'name')
 
     menu_by_category = {}
-    for item in menu_items:
-        category = item.category or "Uncategorized"
-        if category not in menu_by_category:
-            menu_by_category[category] = []
-        menu_by_category[category].append(PublicMenuItemSerializer(item).data)
+    for item in PublicMenuItemSerializer(menu_items, many=True).data:
+        category = item["category"] or "Uncategorized"
+        menu_by_category.setdefault(category, []).append(item)
 
     return Response({
         'system': PublicSystemSerializer(system).data,
@@ -648,7 +794,7 @@ def restaurant_public_view(request, system):
 
 
 # waiter display By Ali
-class WaiterDisplayViewSet(viewsets.ModelViewSet):
+class WaiterDisplayViewSet(OrderDeltaSyncMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ["get", "patch", "head", "options"]
@@ -677,6 +823,9 @@ class WaiterDisplayViewSet(viewsets.ModelViewSet):
             status__in=["ready", "served"]
         ).select_related("waiter").prefetch_related("order_items__menu_item")
 
+    def list(self, request, *args, **kwargs):
+        return self.sync_response(self.get_queryset())
+
     @action(detail=False, methods=["get"])
     def tables(self, request, *args, **kwargs):
         """Get status of all tables"""
@@ -726,13 +875,15 @@ class WaiterDisplayViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with raise_table_conflict():
+            serializer.save()
         return Response(serializer.data)
 
 # delivery By Ali
-class DeliveryViewSet(viewsets.ModelViewSet):
+class DeliveryViewSet(OrderDeltaSyncMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination  # Opt-in with ?rows= / ?cursor=
     http_method_names = ["get", "patch", "head", "options"]
 
     def get_permissions(self):
@@ -780,15 +931,14 @@ class DeliveryViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with raise_table_conflict():
+            serializer.save()
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
     def active(self, request, *args, **kwargs):
-        """Get all ready and out_for_delivery orders"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """Get all ready and out_for_delivery orders (supports ?since= delta sync)"""
+        return self.sync_response(self.get_queryset())
 
     @action(detail=False, methods=["get"])
     def completed(self, request, *args, **kwargs):
@@ -799,7 +949,10 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             system=system,
             order_type="delivery",
             status="completed"
-        ).select_related("waiter").prefetch_related("order_items__menu_item")
+        ).select_related("waiter").prefetch_related("order_items__menu_item").order_by("-created_at", "-id")
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -812,13 +965,17 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             system=system,
             order_type="delivery",
             status="canceled"
-        ).select_related("waiter").prefetch_related("order_items__menu_item")
+        ).select_related("waiter").prefetch_related("order_items__menu_item").order_by("-created_at", "-id")
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
 
-class TableViewSet(viewsets.ViewSet):
+class TableViewSet(ConditionalListMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    etag_resources = ("orders", "tables")
 
     def get_permissions(self):
         editable_roles = ["waiter", "cashier", "manager"]
@@ -828,38 +985,20 @@ class TableViewSet(viewsets.ViewSet):
         ]
 
     def list(self, request, system_id=None):
-        """Get all tables and their active orders"""
+        """Get all tables and their active orders (304 if unchanged since the client's ETag)"""
+        return self.conditional_response(request, lambda: self.table_status(system_id))
+
+    def table_status(self, system_id):
         system = get_object_or_404(System, id=system_id)
         
         # Get restaurant data to determine number of tables
         restaurant_data = get_object_or_404(RestaurantData, system=system)
         total_tables = restaurant_data.number_of_tables
         
-        # Get all orders that are in-house and not completed/canceled
-        active_orders = Order.objects.filter(
-            system=system,
-            order_type="in_house",
-            status__in=["pending", "preparing", "ready", "served"]
-        ).exclude(table_number__isnull=True).exclude(table_number="")
-
-        # Create a dictionary to store table status
-        tables_status = {}
-        
-        # Get all unique table numbers from active orders
-        for order in active_orders:
-            table_number = order.table_number
-            if table_number not in tables_status:
-                tables_status[table_number] = {
-                    "table_number": table_number,
-                    "is_occupied": True,
-                    "current_order": {
-                        "order_id": order.id,
-                        "status": order.status,
-                        "customer_name": order.customer_name,
-                        "waiter": order.waiter.user.username if order.waiter else None,
-                        "created_at": order.created_at
-                    }
-                }
+        # Occupied tables come from the maintained TableState index
+        tables_status = {
+            state["table_number"]: state for state in self.occupied_table_states(system)
+        }
 
         # Add empty tables (tables with no active orders)
         for table_num in range(1, total_tables + 1):  # Use the number from RestaurantData
@@ -873,37 +1012,29 @@ class TableViewSet(viewsets.ViewSet):
 
         return Response(list(tables_status.values()))
 
-    @action(detail=False, methods=['get'])
-    def occupied_tables(self, request, system_id=None):
-        """Get only occupied tables and their active orders"""
-        system = get_object_or_404(System, id=system_id)
-        
-        # Get all orders that are in-house and not completed/canceled
-        active_orders = Order.objects.filter(
-            system=system,
-            order_type="in_house",
-            status__in=["pending", "preparing", "ready", "served"]
-        ).exclude(table_number__isnull=True).exclude(table_number="")
-
-        # Create a list to store occupied table status
-        occupied_tables_status = []
-        
-        # Get all unique table numbers from active orders
-        for order in active_orders:
-            table_number = order.table_number
-            occupied_tables_status.append({
-                "table_number": table_number,
+    def occupied_table_states(self, system):
+        """Occupied tables with their current order, in a single indexed query."""
+        states = TableState.objects.filter(system=system).select_related("order").order_by("order_id")
+        return [
+            {
+                "table_number": state.table_number,
                 "is_occupied": True,
                 "current_order": {
-                    "order_id": order.id,
-                    "status": order.status,
-                    "customer_name": order.customer_name,
-                    "waiter": order.waiter.user.username if order.waiter else None,
-                    "created_at": order.created_at
+                    "order_id": state.order_id,
+                    "status": state.status,
+                    "customer_name": state.order.customer_name,
+                    "waiter": state.waiter_name,
+                    "created_at": state.order.created_at
                 }
-            })
+            }
+            for state in states
+        ]
 
-        return Response(occupied_tables_status)
+    @action(detail=False, methods=['get'])
+    def occupied_tables(self, request, system_id=None):
+        """Get only occupied tables and their active orders"""
+        system = get_object_or_404(System, id=system_id)
+        return Response(self.occupied_table_states(system))
 
 
 class RestaurantDataAPIView(APIView):
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum
+
+from .models import ArchivedSaleItem, SaleItem
+
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+PRICED_LINE = {
+    "unit_price__isnull": False,
+    "unit_cost__isnull": False,
+    "total_price__isnull": False,
+}
+
+
+def sale_lines(system_id, start, end, product_id=None, archived=False):
+    """
+    Priced sale lines (live or archived) for sales made in [start, end).
+    Lines whose product has been deleted are left out, as the reports always did.
+    """
+    model = ArchivedSaleItem if archived else SaleItem
+    lines = model.objects.filter(
+        sale__system_id=system_id,
+        sale__created_at__gte=start,
+        sale__created_at__lt=end,
+        product_id__isnull=False,
+        **PRICED_LINE,
+    )
+    if product_id:
+        lines = lines.filter(product_id=product_id)
+    return lines
+
+
+def product_profit_totals(system_id, start, end, product_id=None):
+    """
+    Per-product quantity, sales, profit and discount for [start, end), grouped in
+    the database. Archived sales are folded in, so old periods report the same.
+    Returns (products, totals).
+    """
+    sums = dict(
+        total_quantity_sold=Sum("quantity"),
+        total_sales=Sum("total_price"),
+        total_profit=Sum((F("unit_price") - F("unit_cost")) * F("quantity"), output_field=MONEY),
+        total_discount=Sum(F("discount_amount") * F("quantity"), output_field=MONEY),
+    )
+    live = (
+        sale_lines(system_id, start, end, product_id)
+        .values("product_id", product_name=F("product__name"))
+        .annotate(**sums)
+        .order_by()
+    )
+    archived = (
+        sale_lines(system_id, start, end, product_id, archived=True)
+        .values("product_id", "product_name")
+        .annotate(**sums)
+        .order_by()
+    )
+
+    products = {}
+    for row in [*live, *archived]:
+        merged = products.get(row["product_id"])
+        if merged is None:
+            products[row["product_id"]] = row
+            continue
+        for field in sums:
+            merged[field] += row[field]
+
+    totals = {
+        field: sum((row[field] for row in products.values()), Decimal("0"))
+        for field in ("total_sales", "total_profit", "total_discount")
+    }
+    return sorted(products.values(), key=lambda row: row["product_name"]), totals
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU with a per-entry time to live."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Per-process tier. Other workers only see an invalidation through the shared tier,
+# so BARCODE_CACHE_TTL bounds how long they may serve a stale product.
+local_products = LRUCache(
+    getattr(settings, "BARCODE_CACHE_SIZE", 5000),
+    getattr(settings, "BARCODE_CACHE_TTL", 30),
+)
+
+
+def barcode_key(system_id, barcode):
+    return f"barcode:{system_id}:{barcode}"
+
+
+def shared_tier_enabled():
+    return getattr(settings, "BARCODE_CACHE_SHARED", False)
+
+
+def get_product(system_id, barcode):
+    """
+    Serialized product (ProductBarcodeSerializer fields plus category) for a scan,
+    from this process, then the shared cache, then the database. None if not found.
+    Callers must not mutate the returned dict.
+    """
+    key = barcode_key(system_id, barcode)
+    data = local_products.get(key)
+    if data is not None:
+        return data
+
+    if shared_tier_enabled():
+        data = cache.get(key)
+        if data is not None:
+            local_products.set(key, data)
+            return data
+
+    return load_products(system_id, [barcode]).get(barcode)
+
+
+def get_products(system_id, barcodes):
+    """
+    Batch form of get_product: {barcode: product} for the barcodes that exist.
+    Misses in this process are looked up with one shared-cache get_many and
+    one `barcode__in` query.
+    """
+    found = {}
+    pending = []
+    for barcode in dict.fromkeys(barcodes):
+        data = local_products.get(barcode_key(system_id, barcode))
+        if data is None:
+            pending.append(barcode)
+        else:
+            found[barcode] = data
+
+    if pending and shared_tier_enabled():
+        shared = cache.get_many([barcode_key(system_id, barcode) for barcode in pending])
+        still_pending = []
+        for barcode in pending:
+            data = shared.get(barcode_key(system_id, barcode))
+            if data is None:
+                still_pending.append(barcode)
+            else:
+                local_products.set(barcode_key(system_id, barcode), data)
+                found[barcode] = data
+        pending = still_pending
+
+    if pending:
+        found.update(load_products(system_id, pending))
+    return found
+
+
+def load_products(system_id, barcodes):
+    """Serialize the system's products with these barcodes in one query and cache them."""
+    from .models import Product
+    from .serializers import ProductBarcodeSerializer
+
+    loaded = {
+        product.barcode: {**ProductBarcodeSerializer(product).data, "category": product.category}
+        for product in Product.objects.filter(system_id=system_id, barcode__in=barcodes)
+    }
+    for barcode, data in loaded.items():
+        local_products.set(barcode_key(system_id, barcode), data)
+    if loaded and shared_tier_enabled():
+        cache.set_many(
+            {barcode_key(system_id, barcode): data for barcode, data in loaded.items()},
+            getattr(settings, "BARCODE_CACHE_TTL", 30),
+        )
+    return loaded
+
+
+def invalidate_barcodes(system_id, *barcodes):
+    """
+    Drop cached products now and again when the surrounding transaction commits,
+    so a scan racing the write cannot re-cache the old row.
+    """
+    keys = [barcode_key(system_id, barcode) for barcode in barcodes if barcode]
+    if not keys:
+        return
+
+    def drop():
+        for key in keys:
+            local_products.delete(key)
+        if shared_tier_enabled():
+            cache.delete_many(keys)
+
+    drop()
+    transaction.on_commit(drop)
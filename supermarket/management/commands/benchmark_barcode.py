@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import System
+from supermarket.barcode_cache import barcode_key, local_products
+from supermarket.models import Product
+from supermarket.views import get_product_by_barcode
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark POS barcode scans against a supermarket: replays lookups through the "
+        "product-by-barcode endpoint with a cold and a warm barcode cache and reports "
+        "scans per second and mean latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("system_id", type=int, help="Supermarket system to benchmark against")
+        parser.add_argument("--scans", type=int, default=2000, help="Lookups per run (default: 2000)")
+
+    def handle(self, *args, **options):
+        try:
+            system = System.objects.get(id=options["system_id"], category="supermarket")
+        except System.DoesNotExist:
+            raise CommandError("Supermarket system not found.")
+
+        barcodes = list(
+            Product.objects.filter(system=system, barcode__isnull=False).values_list("barcode", flat=True)
+        )
+        if not barcodes:
+            raise CommandError("The system has no products with barcodes.")
+
+        factory = APIRequestFactory()
+        scans = [barcodes[i % len(barcodes)] for i in range(options["scans"])]
+
+        def scan(barcode):
+            request = factory.get(f"/api/supermarket/{system.id}/products/barcode/{barcode}/")
+            force_authenticate(request, user=system.owner)
+            response = get_product_by_barcode(request, system_id=system.id, barcode=barcode)
+            if response.status_code != 200:
+                raise CommandError(f"Lookup of {barcode} failed with {response.status_code}.")
+
+        for label, clear_each_scan in (("cold", True), ("warm", False)):
+            local_products.clear()
+            if not clear_each_scan:
+                for barcode in barcodes:
+                    scan(barcode)
+            started = time.perf_counter()
+            for barcode in scans:
+                if clear_each_scan:
+                    local_products.clear()
+                scan(barcode)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:>5}: {len(scans) / elapsed:>9.0f} scans/s, "
+                f"{elapsed / len(scans) * 1000:.3f} ms per scan"
+            )
+
+        # The cache lookup alone, without DRF request handling
+        started = time.perf_counter()
+        for barcode in scans:
+            local_products.get(barcode_key(system.id, barcode))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"cache: {elapsed / len(scans) * 1_000_000:.2f} us per hit")
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+        ('supermarket', '0027_alter_product_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['system', 'created_at'], name='supermarket_system__647fdf_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supermarket', '0028_sale_supermarket_system__647fdf_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockchange',
+            index=models.Index(fields=['-created_at', '-id'], name='supermarket_created_92b24c_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_resourceversion'),
+        ('supermarket', '0029_stockchange_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cashier_id', models.BigIntegerField(blank=True, null=True)),
+                ('total_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('discount_percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('payment_type', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card')], max_length=10)),
+                ('receipt_number', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('system', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_sales', to='core.system')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSaleItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('product_id', models.BigIntegerField(blank=True, null=True)),
+                ('product_name', models.CharField(blank=True, max_length=255)),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('unit_cost', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='supermarket.archivedsale')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['system', 'created_at'], name='supermarket_system__0e5cc1_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('supermarket', '0030_archivedsale_archivedsaleitem_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleItemBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_draws', to='supermarket.productbatch')),
+                ('sale_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_draws', to='supermarket.saleitem')),
+            ],
+        ),
+    ]
@@ -1,15 +1,36 @@
-from django.db import models
-from core.models import System, Employee, delete_cloudinary_image, delete_cloudinary_image_on_update
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, DateField, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.utils import timezone
+from core.models import System, Employee, DailySalesRollup, ResourceVersion, SequenceCounter, delete_cloudinary_image, delete_cloudinary_image_on_update
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
-import uuid
 from decimal import Decimal
-from django.db.models.signals import pre_delete, post_save
+from django.db.models.signals import pre_delete, post_save, post_delete
 from django.dispatch import receiver
+from .barcode_cache import invalidate_barcodes
 
 # Create your models here.
 
 
+# GS1 reserves EAN-13 prefix 2 for in-store numbering, so generated barcodes never
+# collide with manufacturer codes: 2 + 5-digit system id + 6-digit sequence + check digit.
+IN_STORE_BARCODE_PREFIX = "2"
+
+
+def ean13_check_digit(digits):
+    """Check digit for the first 12 digits of an EAN-13 (weights 1, 3 from the left)."""
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+    return str((10 - total % 10) % 10)
+
+
+def in_store_ean13(system_id, number):
+    if system_id > 99999 or number > 999999:
+        raise ValidationError("Barcode numbering exhausted for this system; assign barcodes manually.")
+    digits = f"{IN_STORE_BARCODE_PREFIX}{system_id:05d}{number:06d}"
+    return digits + ean13_check_digit(digits)
+
+
 class Product(models.Model):
     """Products in supermarkets"""
 
@@ -51,6 +72,13 @@ class Product(models.Model):
 
     category = models.CharField(max_length=100, default="pantry")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored barcode so a barcode change also evicts the old cache entry
+        instance._loaded_barcode = dict(zip(field_names, values)).get("barcode")
+        return instance
+
     def clean(self):
         # Validate category if it's a default choice
         if self.category in dict(self.CATEGORY_CHOICES).values():
@@ -63,25 +91,26 @@ class Product(models.Model):
         return f"{self.name} - {self.system.name}"
 
     def generate_barcode(self):
-        """Generate a unique 13-digit barcode"""
-        while True:
-            # Get the first 8 digits from system ID and product ID
-            system_id = str(self.system.id).zfill(3)
-            product_id = str(self.id).zfill(5)
-            prefix = f"{system_id}{product_id}"
-
-            # Generate remaining 5 digits using UUID
-            unique_part = str(uuid.uuid4().int)[:5]
-
-            # Combine to create 13-digit barcode
-            barcode = f"{prefix}{unique_part}"
-
-            # Ensure it's exactly 13 digits
-            barcode = barcode[:13]
-
-            # Check if this barcode already exists
-            if not Product.objects.filter(barcode=barcode).exists():
-                return barcode
+        """Allocate the next free barcode of this product's system (see `allocate_barcodes`)."""
+        return self.allocate_barcodes(self.system_id, 1)[0]
+
+    @classmethod
+    def allocate_barcodes(cls, system_id, count, exclude=()):
+        """
+        The next `count` EAN-13s of a system's sequence. Barcodes are unique across all
+        systems and prefix 2 is shared with scale labels and other in-store codes, so
+        numbers whose code is already taken (or in `exclude`) are skipped, with one
+        `barcode__in` query per allocated block.
+        """
+        exclude = set(exclude)
+        barcodes = []
+        while len(barcodes) < count:
+            wanted = count - len(barcodes)
+            last = SequenceCounter.allocate(system_id, "barcode", count=wanted)
+            block = [in_store_ean13(system_id, number) for number in range(last - wanted + 1, last + 1)]
+            taken = exclude.union(cls.objects.filter(barcode__in=block).values_list("barcode", flat=True))
+            barcodes.extend(barcode for barcode in block if barcode not in taken)
+        return barcodes
 
     def save(self, *args, **kwargs):
         # Handle stock updates if requested
@@ -92,17 +121,67 @@ class Product(models.Model):
             # Update expiry date to earliest batch expiry
             self.expiry_date = self.get_earliest_expiry_date()
 
-        # Generate barcode if it doesn't exist
-        if not self.barcode:
-            # First save to get an ID
+        if self.barcode:
             super().save(*args, **kwargs)
-            # Generate barcode using the ID
+            return
+        # Number the product and write it in one statement; a rollback releases the number
+        with transaction.atomic():
             self.barcode = self.generate_barcode()
-            # Save again with the barcode
-            super().save(update_fields=["barcode"])
-        else:
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "barcode"}
             super().save(*args, **kwargs)
 
+    @classmethod
+    def remove_stock(cls, quantities):
+        """
+        Take {product_id: quantity} out of stock: batches first-expiry-first-out,
+        then one conditional UPDATE of stock_quantity and expiry_date.
+
+        Products are locked in id order first, then their batches, so concurrent
+        checkouts queue instead of deadlocking. Returns (short, draws): the locked
+        products that cannot cover their quantity (missing ids are included as None),
+        and the batches each product was taken from (see `ProductBatch.allocate`).
+        Nothing is changed unless `short` is empty. Must run inside a transaction.
+        """
+        ids = sorted(quantities)
+        locked = cls.objects.select_for_update().filter(pk__in=ids).order_by("pk").in_bulk()
+        short = [
+            (locked.get(pk), quantities[pk])
+            for pk in ids
+            if pk not in locked or locked[pk].stock_quantity < quantities[pk]
+        ]
+        if short:
+            return short, {}
+
+        earliest_expiry, draws = ProductBatch.allocate(quantities)
+        wanted = Case(
+            *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+            output_field=IntegerField(),
+        )
+        # Products with batches now expire with their earliest batch that still has stock
+        expiry = Case(
+            *[
+                When(pk=pk, then=Value(expiry_date, output_field=DateField()))
+                for pk, expiry_date in earliest_expiry.items()
+            ],
+            default=F("expiry_date"),
+            output_field=DateField(),
+        )
+        updated = cls.objects.filter(pk__in=ids, stock_quantity__gte=wanted).update(
+            stock_quantity=F("stock_quantity") - wanted,
+            expiry_date=expiry,
+        )
+        if updated != len(ids):
+            # Unreachable while the locks hold; refuse rather than oversell
+            raise ValidationError("Stock changed during checkout, please retry.")
+
+        # The UPDATE bypasses post_save, so do its receivers' work here
+        for product in locked.values():
+            invalidate_barcodes(product.system_id, product.barcode)
+        for system_id in {product.system_id for product in locked.values()}:
+            ResourceVersion.bump(system_id, "products")
+        return [], draws
+
     def get_total_stock(self):
         """Calculate total stock from all batches"""
         return sum(batch.quantity for batch in self.batches.all())
@@ -130,8 +209,8 @@ class Product(models.Model):
         )
         return earliest_batch.expiry_date if earliest_batch else None
 
-    def get_stock_by_date(self):
-        """Get stock quantities grouped by received date"""
+    def get_stock_by_date(self, receiving_records=None):
+        """Get stock quantities grouped by received date (from `receiving_records` if already loaded)"""
         from django.utils import timezone
         from datetime import timedelta
 
@@ -143,23 +222,22 @@ class Product(models.Model):
         }
 
         # Get all goods receiving records for this product
-        receiving_records = GoodsReceiving.objects.filter(
-            purchase_order__product=self
-        ).order_by("received_date")
+        if receiving_records is None:
+            receiving_records = GoodsReceiving.objects.filter(purchase_order__product=self)
 
         for record in receiving_records:
             days_old = (today - record.received_date).days
             if days_old <= 7:
-                stock_groups["new"] += record.received_quantity
+                stock_groups["new"] += record.received_quantity or 0
             elif days_old <= 30:
-                stock_groups["recent"] += record.received_quantity
+                stock_groups["recent"] += record.received_quantity or 0
             else:
-                stock_groups["old"] += record.received_quantity
+                stock_groups["old"] += record.received_quantity or 0
 
         return stock_groups
 
-    def get_stock_by_expiry(self):
-        """Get stock quantities grouped by expiry date"""
+    def get_stock_by_expiry(self, receiving_records=None):
+        """Get stock quantities grouped by expiry date (from `receiving_records` if already loaded)"""
         from django.utils import timezone
         from datetime import timedelta
 
@@ -171,18 +249,19 @@ class Product(models.Model):
         }
 
         # Get all goods receiving records for this product
-        receiving_records = GoodsReceiving.objects.filter(purchase_order__product=self)
+        if receiving_records is None:
+            receiving_records = GoodsReceiving.objects.filter(purchase_order__product=self)
 
         for record in receiving_records:
             if not record.expiry_date:
                 continue
             days_to_expiry = (record.expiry_date - today).days
             if days_to_expiry < 0:
-                expiry_groups["expired"] += record.received_quantity
+                expiry_groups["expired"] += record.received_quantity or 0
             elif days_to_expiry <= 7:
-                expiry_groups["expiring_soon"] += record.received_quantity
+                expiry_groups["expiring_soon"] += record.received_quantity or 0
             else:
-                expiry_groups["expiring_later"] += record.received_quantity
+                expiry_groups["expiring_later"] += record.received_quantity or 0
 
         return expiry_groups
 
@@ -199,6 +278,15 @@ def update_product_image(sender, instance, **kwargs):
 def delete_product_image(sender, instance, **kwargs):
     delete_cloudinary_image(instance.image)
 
+@receiver([post_save, post_delete], sender=Product)
+def bump_products_version(sender, instance, **kwargs):
+    ResourceVersion.bump(instance.system_id, "products")
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_barcode(sender, instance, **kwargs):
+    invalidate_barcodes(instance.system_id, instance.barcode, getattr(instance, "_loaded_barcode", None))
+
 
 class ProductBatch(models.Model):
     """Tracks different batches of products with their expiry dates"""
@@ -220,6 +308,53 @@ class ProductBatch(models.Model):
     class Meta:
         ordering = ["expiry_date", "created_at"]
 
+    @classmethod
+    def allocate(cls, quantities):
+        """
+        Take {product_id: quantity} out of the products' batches, first expiry first
+        out, with one locked query ordered by expiry and one bulk_update of the
+        batches touched. Quantity beyond the batched stock comes out of stock that
+        was never batched (products stocked without a purchase order).
+
+        Returns ({product_id: earliest expiry still in stock, or None} for every
+        product that has batches, {product_id: [(batch_id, quantity taken), ...]} in
+        the order taken). Must run inside a transaction.
+        """
+        remaining = dict(quantities)
+        earliest_expiry = {}
+        draws = {}
+        touched = []
+        now = timezone.now()
+        batches = (
+            cls.objects.select_for_update()
+            .filter(product_id__in=list(quantities), quantity__gt=0)
+            .order_by("product_id", "expiry_date", "created_at", "id")
+        )
+        for batch in batches:
+            wanted = remaining[batch.product_id]
+            if wanted:
+                taken = min(wanted, batch.quantity)
+                batch.quantity -= taken
+                batch.updated_at = now
+                remaining[batch.product_id] = wanted - taken
+                touched.append(batch)
+                draws.setdefault(batch.product_id, []).append((batch.id, taken))
+            earliest_expiry.setdefault(batch.product_id, None)
+            if batch.quantity and earliest_expiry[batch.product_id] is None:
+                earliest_expiry[batch.product_id] = batch.expiry_date
+
+        if touched:
+            cls.objects.bulk_update(touched, ["quantity", "updated_at"])
+        return earliest_expiry, draws
+
+
+@receiver([post_save, post_delete], sender=ProductBatch)
+def bump_product_batch_version(sender, instance, **kwargs):
+    # Product rows expanded with ?expand=batches embed their batches
+    system_id = Product.objects.filter(pk=instance.product_id).values_list("system_id", flat=True).first()
+    if system_id:
+        ResourceVersion.bump(system_id, "products")
+
 
 class StockChange(models.Model):
     product = models.ForeignKey(
@@ -233,6 +368,12 @@ class StockChange(models.Model):
         auto_now_add=True
     )  # This is the correct field for timestamp
 
+    class Meta:
+        indexes = [
+            # Backs the newest-first stock history cursor
+            models.Index(fields=["-created_at", "-id"]),
+        ]
+
     def __str__(self):
         return f"{self.change_type} - {self.product.name} ({self.quantity_changed})"
 
@@ -265,15 +406,36 @@ class Sale(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     receipt_number = models.CharField(max_length=50, unique=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Backs created_at range queries (dashboards, history lists)
+            models.Index(fields=["system", "created_at"]),
+        ]
+
     def __str__(self):
         return f"Sale #{self.receipt_number} - {self.created_at}"
 
     def save(self, *args, **kwargs):
-        if not self.receipt_number:
-            # Generate a unique receipt number
-            timestamp = int(time.time())
-            self.receipt_number = f"RCP-{self.system.id}-{timestamp}"
-        super().save(*args, **kwargs)
+        if self.receipt_number or not self.system_id:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            # The counter row stays locked until this sale is stored
+            self.receipt_number = self.next_receipt_number(self.system_id)
+            super().save(*args, **kwargs)
+
+    @staticmethod
+    def next_receipt_number(system_id):
+        """
+        RCP-<system>-<YYYYMMDD>-<00042> from a per-system daily counter, or
+        RCP-<system>-<000042> when RECEIPT_NUMBER_RESET_DAILY is off.
+        """
+        if getattr(settings, "RECEIPT_NUMBER_RESET_DAILY", True):
+            today = timezone.localdate()
+            number = SequenceCounter.allocate(system_id, "receipt", day=today)
+            return f"RCP-{system_id}-{today:%Y%m%d}-{number:05d}"
+        number = SequenceCounter.allocate(system_id, "receipt")
+        return f"RCP-{system_id}-{number:06d}"
 
     def calculate_total(self):
         """Calculate total price with discount percentage"""
@@ -284,6 +446,30 @@ class Sale(models.Model):
         self.total_price = subtotal - discount_amount
         self.save()
 
+    def record_daily_rollup(self, sign=1):
+        """Add (sign=1) or remove (sign=-1) this sale's totals from its business day's rollup."""
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        totals = self.items.filter(product__isnull=False).aggregate(
+            revenue=Sum("total_price"),
+            cost=Sum(F("unit_cost") * F("quantity"), output_field=money),
+            profit=Sum((F("unit_price") - F("unit_cost")) * F("quantity"), output_field=money),
+            discount=Sum(F("discount_amount") * F("quantity"), output_field=money),
+        )
+        DailySalesRollup.record(
+            self.system_id,
+            timezone.localdate(self.created_at),
+            orders=sign,
+            revenue=sign * (totals["revenue"] or 0),
+            cost=sign * (totals["cost"] or 0),
+            profit=sign * (totals["profit"] or 0),
+            discount=sign * (totals["discount"] or 0),
+        )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.record_daily_rollup(-1)
+            return super().delete(*args, **kwargs)
+
 
 class SaleItem(models.Model):
     """Individual items in a sale"""
@@ -324,34 +510,122 @@ class SaleItem(models.Model):
         if self.unit_price is not None:
             self.total_price = (self.unit_price * self.quantity) - self.discount_amount
 
-        # If this is a new sale item, update stock quantities
-        if not self.pk:
-            # Get fresh product instance to avoid race conditions
-            product = Product.objects.select_for_update().get(pk=self.product.pk)
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
 
-            # Double check stock availability
-            if self.quantity > product.stock_quantity:
+        # New sale item: take the stock (batches first-expiry-first-out) with the insert
+        with transaction.atomic():
+            short, draws = Product.remove_stock({self.product_id: self.quantity})
+            if short:
+                product, _ = short[0]
                 raise ValidationError(
-                    f"Not enough stock available. Only {product.stock_quantity} units left."
+                    f"Not enough stock available. Only {product.stock_quantity if product else 0} units left."
                 )
+            super().save(*args, **kwargs)
+            SaleItemBatch.record([self], draws)
 
-            # Update product stock quantity by subtracting exactly the sold quantity
-            product.stock_quantity = product.stock_quantity - self.quantity
-            product.save(update_fields=["stock_quantity"])
+    def delete(self, *args, **kwargs):
+        if not self.pk or self.product_id is None:
+            return super().delete(*args, **kwargs)
+
+        # Put the units back where they came from: the batches this line drew from
+        # (first-expiry-first-out at checkout) and the product's stock, in one transaction
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(pk=self.product_id)
+            draws = list(self.batch_draws.values_list("batch_id", "quantity"))
+            updates = {"stock_quantity": F("stock_quantity") + self.quantity}
+            if draws:
+                ProductBatch.objects.filter(pk__in=[batch_id for batch_id, _ in draws]).update(
+                    quantity=F("quantity") + Case(
+                        *[When(pk=batch_id, then=Value(quantity)) for batch_id, quantity in draws],
+                        output_field=IntegerField(),
+                    ),
+                    updated_at=timezone.now(),
+                )
+                # The product expires with its earliest batch that has stock again
+                updates["expiry_date"] = Subquery(
+                    ProductBatch.objects.filter(product=OuterRef("pk"), quantity__gt=0)
+                    .order_by("expiry_date", "created_at")
+                    .values("expiry_date")[:1]
+                )
+            Product.objects.filter(pk=product.pk).update(**updates)
 
-        super().save(*args, **kwargs)
+            # The UPDATEs bypass post_save, so do its receivers' work here
+            invalidate_barcodes(product.system_id, product.barcode)
+            ResourceVersion.bump(product.system_id, "products")
+            return super().delete(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        # If this is an existing sale item being deleted, restore stock quantities
-        if self.pk:
-            # Get fresh product instance to avoid race conditions
-            product = Product.objects.select_for_update().get(pk=self.product.pk)
 
-            # Update product stock quantity by adding back exactly the sold quantity
-            product.stock_quantity = product.stock_quantity + self.quantity
-            product.save(update_fields=["stock_quantity"])
+class SaleItemBatch(models.Model):
+    """The units of a sale line taken from one batch, so voiding the line can return them."""
 
-        super().delete(*args, **kwargs)
+    sale_item = models.ForeignKey(SaleItem, on_delete=models.CASCADE, related_name="batch_draws")
+    batch = models.ForeignKey(ProductBatch, on_delete=models.CASCADE, related_name="sale_draws")
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.sale_item_id} - Batch {self.batch_id}: {self.quantity}"
+
+    @classmethod
+    def record(cls, items, draws):
+        """
+        Split {product_id: [(batch_id, quantity), ...]} from `Product.remove_stock`
+        over saved `items` in order (lines of one product share its draws) and store
+        them. Units taken from unbatched stock are not recorded.
+        """
+        draws = {product_id: list(batches) for product_id, batches in draws.items()}
+        rows = []
+        for item in items:
+            wanted = item.quantity
+            batches = draws.get(item.product_id, [])
+            while wanted and batches:
+                batch_id, available = batches[0]
+                taken = min(wanted, available)
+                rows.append(cls(sale_item=item, batch_id=batch_id, quantity=taken))
+                wanted -= taken
+                if taken == available:
+                    batches.pop(0)
+                else:
+                    batches[0] = (batch_id, available - taken)
+        cls.objects.bulk_create(rows)
+
+
+class ArchivedSale(models.Model):
+    """Sales moved out of the hot Sale table by `manage.py archive_history`; keeps the original id."""
+
+    id = models.BigIntegerField(primary_key=True)
+    system = models.ForeignKey(
+        System, on_delete=models.CASCADE, related_name="archived_sales", null=True, blank=True
+    )
+    cashier_id = models.BigIntegerField(null=True, blank=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    discount_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    payment_type = models.CharField(max_length=10, choices=Sale.PAYMENT_CHOICES)
+    receipt_number = models.CharField(max_length=50, null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["system", "created_at"])]
+
+    def __str__(self):
+        return f"Archived sale #{self.receipt_number}"
+
+
+class ArchivedSaleItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    sale = models.ForeignKey(ArchivedSale, on_delete=models.CASCADE, related_name="items")
+    product_id = models.BigIntegerField(null=True, blank=True)
+    product_name = models.CharField(max_length=255, blank=True)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name} in archived sale {self.sale_id}"
 
 
 class Discount(models.Model):
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from core.models import System
 from rest_framework import serializers
 from .models import (
@@ -5,6 +7,7 @@ from .models import (
     StockChange,
     Sale,
     SaleItem,
+    SaleItemBatch,
     Discount,
     Supplier,
     PurchaseOrder,
@@ -15,13 +18,15 @@ from django.utils import timezone
 from decimal import Decimal
 import time
 from django.shortcuts import get_object_or_404
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 import requests
 import cloudinary
 import cloudinary.uploader
 from io import BytesIO
 from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 
 def upload_image_from_url_to_cloudinary(image_url):
@@ -57,7 +62,150 @@ def upload_image_from_url_to_cloudinary(image_url):
         return None
 
 
-class InventorysupItemSerializer(serializers.ModelSerializer):
+class ExpandableProductSerializer(serializers.ModelSerializer):
+    """
+    Compact product rows by default; the batch and stock breakdowns are opt-in with
+    ?expand=batches,stock_by_expiry,... (or ?expand=all), read from `context["expand"]`.
+    Use `prefetch()` on the queryset so expansions are computed from prefetched rows,
+    not per-product queries. Subclasses list EXPANSIONS in their Meta.fields.
+    """
+
+    EXPANSIONS = (
+        "batches",
+        "batch_groups",
+        "expiring_batches",
+        "newest_batch",
+        "oldest_batch",
+        "stock_by_date",
+        "stock_by_expiry",
+        "available_categories",
+    )
+    BATCH_EXPANSIONS = {"batches", "batch_groups", "expiring_batches", "newest_batch", "oldest_batch"}
+    RECEIVING_EXPANSIONS = {"stock_by_date", "stock_by_expiry"}
+
+    batches = serializers.SerializerMethodField()
+    expiring_batches = serializers.SerializerMethodField()
+    newest_batch = serializers.SerializerMethodField()
+    oldest_batch = serializers.SerializerMethodField()
+    batch_groups = serializers.SerializerMethodField()
+    stock_by_date = serializers.SerializerMethodField()
+    stock_by_expiry = serializers.SerializerMethodField()
+    available_categories = serializers.SerializerMethodField()
+
+    @classmethod
+    def requested_expansions(cls, request):
+        """The expansions named in ?expand= (comma separated; "all" for every one)."""
+        names = {name.strip() for name in request.query_params.get("expand", "").split(",")}
+        if "all" in names:
+            return set(cls.EXPANSIONS)
+        return names & set(cls.EXPANSIONS)
+
+    @classmethod
+    def prefetch(cls, queryset, expand):
+        """Prefetch only what the requested expansions read: batches and/or goods-receiving rows."""
+        if expand & cls.BATCH_EXPANSIONS:
+            queryset = queryset.prefetch_related("batches")
+        if expand & cls.RECEIVING_EXPANSIONS:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "purchase_orders",
+                    queryset=PurchaseOrder.objects.prefetch_related("goods_receiving"),
+                    to_attr="prefetched_purchase_orders",
+                )
+            )
+        return queryset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get("expand", set())
+        for name in self.EXPANSIONS:
+            if name not in expand:
+                fields.pop(name)
+        return fields
+
+    def stocked_batches(self, obj):
+        """Batches with stock left, by expiry date (Meta ordering of the prefetched rows)."""
+        return [batch for batch in obj.batches.all() if batch.quantity > 0]
+
+    def receiving_records(self, obj):
+        purchase_orders = getattr(obj, "prefetched_purchase_orders", None)
+        if purchase_orders is None:
+            # Not prefetched (single objects, write responses): load them for this product
+            purchase_orders = obj.purchase_orders.prefetch_related("goods_receiving")
+        return [
+            record
+            for purchase_order in purchase_orders
+            for record in purchase_order.goods_receiving.all()
+        ]
+
+    def get_batches(self, obj):
+        return ProductBatchSerializer(obj.batches.all(), many=True).data
+
+    def get_batch_groups(self, obj):
+        """Group batches by expiry date"""
+        today = timezone.now().date()
+        groups = {
+            "expired": [],
+            "expiring_soon": [],  # Within 7 days
+            "expiring_later": [],  # More than 7 days
+            "no_expiry": [],  # No expiry date set
+        }
+
+        for batch in self.stocked_batches(obj):
+            if not batch.expiry_date:
+                groups["no_expiry"].append(ProductBatchSerializer(batch).data)
+            elif batch.expiry_date < today:
+                groups["expired"].append(ProductBatchSerializer(batch).data)
+            elif batch.expiry_date <= today + timedelta(days=7):
+                groups["expiring_soon"].append(ProductBatchSerializer(batch).data)
+            else:
+                groups["expiring_later"].append(ProductBatchSerializer(batch).data)
+
+        return groups
+
+    def get_expiring_batches(self, obj):
+        """Batches with stock expiring within 30 days (Product.get_expiring_batches)"""
+        cutoff = timezone.now().date() + timedelta(days=30)
+        batches = [batch for batch in self.stocked_batches(obj) if batch.expiry_date <= cutoff]
+        return ProductBatchSerializer(batches, many=True).data
+
+    def get_newest_batch(self, obj):
+        batches = self.stocked_batches(obj)
+        batch = max(batches, key=lambda b: b.created_at) if batches else None
+        return ProductBatchSerializer(batch).data if batch else None
+
+    def get_oldest_batch(self, obj):
+        batches = self.stocked_batches(obj)
+        batch = min(batches, key=lambda b: b.created_at) if batches else None
+        return ProductBatchSerializer(batch).data if batch else None
+
+    def get_stock_by_date(self, obj):
+        """Get stock quantities grouped by received date"""
+        return obj.get_stock_by_date(self.receiving_records(obj))
+
+    def get_stock_by_expiry(self, obj):
+        """Get stock quantities grouped by expiry date"""
+        return obj.get_stock_by_expiry(self.receiving_records(obj))
+
+    def get_available_categories(self, obj):
+        """Get all available categories for the system, once per response"""
+        cache = self.context.setdefault("available_categories", {})
+        if obj.system_id not in cache:
+            # Get default categories
+            default_categories = dict(Product.CATEGORY_CHOICES)
+
+            # Get custom categories used in the system
+            custom_categories = (
+                Product.objects.filter(system_id=obj.system_id)
+                .exclude(category__in=default_categories.values())
+                .values_list("category", flat=True)
+                .distinct()
+            )
+            cache[obj.system_id] = {"default": default_categories, "custom": list(custom_categories)}
+        return cache[obj.system_id]
+
+
+class InventorysupItemSerializer(ExpandableProductSerializer):
     image_url = serializers.URLField(write_only=True, required=False, allow_null=True)
     
     def validate_category(self, value):
@@ -80,6 +228,7 @@ class InventorysupItemSerializer(serializers.ModelSerializer):
             "image_url",
             "category",
             "discount_percentage",
+            *ExpandableProductSerializer.EXPANSIONS,
         ]
         extra_kwargs = {
             "minimum_stock": {"required": False, "default": 10},
@@ -126,7 +275,11 @@ class InventorysupItemSerializer(serializers.ModelSerializer):
                     "image_url": "Failed to upload image from URL. Please check the URL and try again."
                 })
         
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            # Product.save numbers products without a barcode and refuses once the numbering runs out
+            raise serializers.ValidationError({"barcode": e.messages})
 
     def update(self, instance, validated_data):
         image_url = validated_data.pop('image_url', None)
@@ -144,7 +297,10 @@ class InventorysupItemSerializer(serializers.ModelSerializer):
         # Only update the fields that were provided in the request
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        try:
+            instance.save()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"barcode": e.messages})
         return instance
 
 
@@ -175,17 +331,9 @@ class ProductBatchSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    batches = ProductBatchSerializer(many=True, read_only=True)
-    expiring_batches = serializers.SerializerMethodField()
-    newest_batch = serializers.SerializerMethodField()
-    oldest_batch = serializers.SerializerMethodField()
-    batch_groups = serializers.SerializerMethodField()
-    stock_by_date = serializers.SerializerMethodField()
-    stock_by_expiry = serializers.SerializerMethodField()
+class ProductSerializer(ExpandableProductSerializer):
     image = serializers.ImageField(required=False, allow_null=True)
     category = serializers.CharField(max_length=100)
-    available_categories = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -211,75 +359,30 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["barcode"]
 
-    def get_batch_groups(self, obj):
-        """Group batches by expiry date"""
-        from django.utils import timezone
-        from datetime import timedelta
-
-        today = timezone.now().date()
-        batches = obj.batches.filter(quantity__gt=0).order_by("expiry_date")
-
-        groups = {
-            "expired": [],
-            "expiring_soon": [],  # Within 7 days
-            "expiring_later": [],  # More than 7 days
-            "no_expiry": [],  # No expiry date set
-        }
-
-        for batch in batches:
-            if not batch.expiry_date:
-                groups["no_expiry"].append(ProductBatchSerializer(batch).data)
-            elif batch.expiry_date < today:
-                groups["expired"].append(ProductBatchSerializer(batch).data)
-            elif batch.expiry_date <= today + timedelta(days=7):
-                groups["expiring_soon"].append(ProductBatchSerializer(batch).data)
-            else:
-                groups["expiring_later"].append(ProductBatchSerializer(batch).data)
-
-        return groups
-
-    def get_expiring_batches(self, obj):
-        batches = obj.get_expiring_batches()
-        return ProductBatchSerializer(batches, many=True).data
-
-    def get_newest_batch(self, obj):
-        batch = obj.get_newest_batch()
-        return ProductBatchSerializer(batch).data if batch else None
-
-    def get_oldest_batch(self, obj):
-        batch = obj.get_oldest_batch()
-        return ProductBatchSerializer(batch).data if batch else None
-
-    def get_stock_by_date(self, obj):
-        """Get stock quantities grouped by received date"""
-        return obj.get_stock_by_date()
-
-    def get_stock_by_expiry(self, obj):
-        """Get stock quantities grouped by expiry date"""
-        return obj.get_stock_by_expiry()
-
-    def get_available_categories(self, obj):
-        """Get all available categories for the system"""
-        # Get default categories
-        default_categories = dict(Product.CATEGORY_CHOICES)
-
-        # Get custom categories used in the system
-        custom_categories = (
-            Product.objects.filter(system=obj.system)
-            .exclude(category__in=default_categories.values())
-            .values_list("category", flat=True)
-            .distinct()
-        )
-
-        return {"default": default_categories, "custom": list(custom_categories)}
-
     def validate_category(self, value):
         if not value.strip():
             raise serializers.ValidationError("Category cannot be empty")
         return value
 
 
+class ProductPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves products from `context["products"]` (id -> Product) when the parent
+    serializer has loaded the whole basket in one query, instead of one query per line.
+    """
+
+    def to_internal_value(self, data):
+        products = self.context.get("products")
+        if products is None:
+            return super().to_internal_value(data)
+        try:
+            return products[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail("does_not_exist", pk_value=data)
+
+
 class SaleItemSerializer(serializers.ModelSerializer):
+    product = ProductPrimaryKeyField(queryset=Product.objects.all())
     product_name = serializers.CharField(source="product.name", read_only=True)
     original_price = serializers.DecimalField(
         max_digits=10, decimal_places=2, read_only=True
@@ -362,6 +465,21 @@ class SaleCreateSerializer(serializers.ModelSerializer):
         model = Sale
         fields = ["payment_type", "items", "discount_percentage"]
 
+    def to_internal_value(self, data):
+        items = data.get("items") if hasattr(data, "get") else None
+        if isinstance(items, list) and "products" not in self.context:
+            # Load every product of the basket, from this system only, in one query
+            ids = set()
+            for item in items:
+                try:
+                    ids.add(int(item.get("product")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context["products"] = Product.objects.filter(
+                system_id=self.context["system_id"], id__in=ids
+            ).in_bulk()
+        return super().to_internal_value(data)
+
     def validate_items(self, items_data):
         for item_data in items_data:
             product = item_data["product"]
@@ -382,45 +500,50 @@ class SaleCreateSerializer(serializers.ModelSerializer):
         system_id = self.context["system_id"]
         cashier = self.context["cashier"]
 
-        # Generate receipt number
-        receipt_number = f"RCP-{system_id}-{int(time.time())}"
+        # validate() already priced every line; merge repeated products for the stock update
+        quantities = defaultdict(int)
+        for item_data in items_data:
+            quantities[item_data["product"].pk] += item_data["quantity"]
+
+        subtotal = sum((item_data["total_price"] for item_data in items_data), Decimal("0"))
+        total_price = (subtotal - subtotal * (discount_percentage / Decimal(100))).quantize(Decimal("0.01"))
 
         with transaction.atomic():
-            # Create the sale
+            short, draws = Product.remove_stock(quantities)
+            if short:
+                raise serializers.ValidationError({
+                    "items": [
+                        f"Not enough stock available for {product.name}. "
+                        f"Only {product.stock_quantity} units left."
+                        if product else "A product in this sale is no longer available."
+                        for product, quantity in short
+                    ]
+                })
+
+            # Sale.save() takes the next receipt number inside this transaction
             sale = Sale.objects.create(
                 system_id=system_id,
                 cashier=cashier,
-                receipt_number=receipt_number,
                 discount_percentage=discount_percentage,
+                total_price=total_price,
                 **validated_data,
             )
 
-            # Create sale items and update stock
-            for item_data in items_data:
-                product = item_data["product"]
-                quantity = Decimal(str(item_data["quantity"]))
-
-                # Set unit price from product's price and calculate total
-                item_data["unit_price"] = product.price
-                item_data["total_price"] = (product.price * quantity) - item_data.get(
-                    "discount_amount", Decimal("0")
-                )
-
-                # Create sale item
-                SaleItem.objects.create(sale=sale, **item_data)
-
-                # Update stock quantity
-                product.stock_quantity -= quantity
-                product.save()
-
-                # Create stock change record
-                StockChange.objects.create(
-                    product=product, quantity_changed=-quantity, change_type="remove"
-                )
-
-            # Calculate total
-            sale.calculate_total()
-            return sale
+            # bulk_create skips SaleItem.save(), which would lock and decrement stock again
+            items = SaleItem.objects.bulk_create([SaleItem(sale=sale, **item_data) for item_data in items_data])
+            # Remember which batches each line came from, so voiding a line restocks them
+            SaleItemBatch.record(items, draws)
+            StockChange.objects.bulk_create([
+                StockChange(product_id=product_id, quantity_changed=-quantity, change_type="remove")
+                for product_id, quantity in quantities.items()
+            ])
+
+            # Add the sale to its day's dashboard totals in the same transaction
+            sale.record_daily_rollup()
+
+        # One query for the response's line items and their product names
+        prefetch_related_objects([sale], Prefetch("items", queryset=SaleItem.objects.select_related("product")))
+        return sale
 
 
 class DiscountSerializer(serializers.ModelSerializer):
@@ -1,3 +1,135 @@
-from django.test import TestCase
+import threading
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APITestCase
+
+from core.models import SequenceCounter, System
+from .models import Product, ProductBatch, PurchaseOrder, Sale, SaleItem, Supplier, in_store_ean13
+
+
+class ReceiptNumberConcurrencyTests(TransactionTestCase):
+    """Receipt numbers come from SequenceCounter, so parallel checkouts never collide."""
+
+    WORKERS = 8
+    ALLOCATIONS_PER_WORKER = 25
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="secret")
+        self.system = System.objects.create(name="Shop", owner=self.owner, category="supermarket")
+
+    def run_in_parallel(self, allocate):
+        """Call `allocate()` from WORKERS threads at once; returns every value they got."""
+        start = threading.Barrier(self.WORKERS)
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                start.wait()
+                for _ in range(self.ALLOCATIONS_PER_WORKER):
+                    results.append(allocate())
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_parallel_allocations_are_unique_and_consecutive(self):
+        numbers = self.run_in_parallel(lambda: SequenceCounter.allocate(self.system.id, "receipt"))
+
+        total = self.WORKERS * self.ALLOCATIONS_PER_WORKER
+        self.assertEqual(sorted(numbers), list(range(1, total + 1)))
+
+    def test_parallel_receipt_numbers_never_collide(self):
+        receipts = self.run_in_parallel(lambda: Sale.next_receipt_number(self.system.id))
+
+        total = self.WORKERS * self.ALLOCATIONS_PER_WORKER
+        self.assertEqual(len(set(receipts)), total)
+        self.assertEqual(sorted(int(receipt.rsplit("-", 1)[1]) for receipt in receipts), list(range(1, total + 1)))
+
+
+class ProductBarcodeNumberingTests(APITestCase):
+    """Products created without a barcode get the next in-store EAN-13 of their system."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="secret")
+        self.system = System.objects.create(name="Shop", owner=self.owner, category="supermarket")
+        self.client.force_authenticate(self.owner)
+        self.url = f"/api/supermarket/{self.system.id}/products/"
+
+    def test_product_without_barcode_is_numbered(self):
+        response = self.client.post(self.url, {"name": "Bread", "price": "2.50", "stock_quantity": 5})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["barcode"], in_store_ean13(self.system.id, 1))
+
+    def test_exhausted_numbering_is_a_validation_error(self):
+        SequenceCounter.objects.create(system=self.system, name="barcode", last_value=999999)
+
+        response = self.client.post(self.url, {"name": "Bread", "price": "2.50", "stock_quantity": 5})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("barcode", response.data)
+        self.assertFalse(Product.objects.filter(system=self.system).exists())
+
+
+class SaleItemVoidTests(APITestCase):
+    """Deleting a sale line returns its units to the batches checkout took them from."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="secret")
+        self.system = System.objects.create(name="Shop", owner=self.owner, category="supermarket")
+        self.client.force_authenticate(self.owner)
+        self.product = Product.objects.create(
+            system=self.system, name="Milk", barcode="4000000000001", price="1.20", stock_quantity=7,
+            expiry_date=date(2030, 1, 1),
+        )
+        supplier = Supplier.objects.create(system=self.system, name="Dairy", phone="+123456789")
+        purchase_order = PurchaseOrder.objects.create(
+            system=self.system, supplier=supplier, product=self.product, quantity=7, cost="0.80",
+            expected_delivery_date=date(2029, 12, 1),
+        )
+        self.early = ProductBatch.objects.create(
+            product=self.product, purchase_order=purchase_order, quantity=3, expiry_date=date(2030, 1, 1)
+        )
+        self.late = ProductBatch.objects.create(
+            product=self.product, purchase_order=purchase_order, quantity=4, expiry_date=date(2030, 2, 1)
+        )
+
+    def checkout(self, *quantities):
+        response = self.client.post(
+            f"/api/supermarket/{self.system.id}/sales/",
+            {"payment_type": "cash", "items": [{"product": self.product.id, "quantity": q} for q in quantities]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return SaleItem.objects.filter(id__in=[item["id"] for item in response.data["items"]]).order_by("id")
+
+    def assertStock(self, stock, early, late, expiry_date):
+        self.product.refresh_from_db()
+        self.early.refresh_from_db()
+        self.late.refresh_from_db()
+        self.assertEqual(
+            (self.product.stock_quantity, self.early.quantity, self.late.quantity, self.product.expiry_date),
+            (stock, early, late, expiry_date),
+        )
+
+    def test_void_restores_the_batches_each_line_drew_from(self):
+        first, second = self.checkout(2, 2)
+        self.assertStock(3, 0, 3, date(2030, 2, 1))
+
+        second.delete()
+        self.assertStock(5, 1, 4, date(2030, 1, 1))
+
+        first.delete()
+        self.assertStock(7, 3, 4, date(2030, 1, 1))
@@ -14,6 +14,7 @@ from .views import (
     get_categories,
     get_used_categories,
     get_product_by_barcode,
+    get_products_by_barcodes,
     supermarket_public_barcode_view,
 )
 import json
@@ -164,6 +165,15 @@ urlpatterns = [
         ),
         name="sale-daily-profit",
     ),
+    path(
+        "<int:system_id>/sales/profit/lines/",
+        SaleViewSet.as_view(
+            {
+                "get": "profit_lines",
+            }
+        ),
+        name="sale-profit-lines",
+    ),
     path(
         "<int:system_id>/sales/profit/all-days/",
         daily_profit_history,
@@ -293,5 +303,10 @@ urlpatterns = [
         get_product_by_barcode,
         name="product-by-barcode",
     ),
+    path(
+        "<int:system_id>/products/barcodes/",
+        get_products_by_barcodes,
+        name="products-by-barcodes",
+    ),
     path('barcode/<str:barcode>/', supermarket_public_barcode_view, name='public-barcode-view'),
 ]
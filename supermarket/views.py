@@ -7,14 +7,15 @@ from django.core.exceptions import PermissionDenied, ValidationError
 from django.db import transaction
 from django.utils import timezone
 from datetime import date, timedelta, datetime
-from django.db.models import F, Q, Count
-from django.db.models.functions import TruncDate, TruncHour
+from django.db.models import F, Q, Count, Exists, ExpressionWrapper, OuterRef
+from django.db.models.functions import TruncHour
 
-from core.models import System, Employee
+from core.models import System, Employee, DailySalesRollup
 from .models import (
     Product,
     StockChange,
     Sale,
+    SaleItem,
     Discount,
     Supplier,
     PurchaseOrder,
@@ -40,11 +41,16 @@ from .serializers import (
 from core.permissions import IsSystemOwner, IsEmployeeRolePermission
 from rest_framework.permissions import OR
 from core.serializers import PublicSystemSerializer
-from core.pagination import CustomPagination
+from core.pagination import CustomPagination, CreatedAtCursorPagination
+from core.conditional import ConditionalListMixin
+from .analytics import MONEY, product_profit_totals, sale_lines
+from .barcode_cache import get_product as get_cached_product, get_products as get_cached_products
+from core.analytics import count_for_periods, day_start, time_series
 
 
-class InventoryItemViewSet(viewsets.ModelViewSet):
+class InventoryItemViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = InventorysupItemSerializer
+    etag_resources = ("products",)
     
     def get_permissions(self):
         """
@@ -68,7 +74,13 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         Permissions are handled by `get_permissions`, so we only need to filter.
         """
         system_id = self.kwargs.get("system_id")
-        return Product.objects.filter(system_id=system_id)
+        queryset = Product.objects.filter(system_id=system_id)
+        if self.action in ("list", "retrieve", "low_stock", "expired_products"):
+            # Prefetch only what ?expand= asks for, so expanded rows stay a fixed number of queries
+            queryset = InventorysupItemSerializer.prefetch(
+                queryset, InventorysupItemSerializer.requested_expansions(self.request)
+            )
+        return queryset
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -79,14 +91,9 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         system_id = self.kwargs.get("system_id")
         system = get_object_or_404(System, id=system_id)
 
-        # Create the product using serializer's save method
+        # Create the product using serializer's save method (Product.save assigns a missing barcode)
         product = serializer.save(system=system)
 
-        # Generate barcode if not already set
-        if not product.barcode:
-            product.generate_barcode()
-            product.save()
-
         # Create initial stock change record
         StockChange.objects.create(
             product=product, quantity_changed=product.stock_quantity, change_type="add"
@@ -132,12 +139,22 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
             Q(batches__expiry_date__gte=today, batches__expiry_date__lte=soon)
         ).distinct()
 
-        serializer = ProductSerializer(expiring_products, many=True, context={"request": request})
+        # Compact rows unless ?expand= asks for batch/stock breakdowns, which are prefetched
+        expand = ProductSerializer.requested_expansions(request)
+        expiring_products = ProductSerializer.prefetch(expiring_products, expand)
+        serializer = ProductSerializer(
+            expiring_products, many=True, context={"request": request, "expand": expand}
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], url_path="stock-history")
     def stock_history(self, request, system_id=None):
-        stock_changes = StockChange.objects.filter(product__system_id=system_id).order_by("-created_at")
+        stock_changes = StockChange.objects.filter(product__system_id=system_id).order_by("-created_at", "-id")
+        # Cursor pagination is opt-in (?rows= / ?cursor=) so existing clients keep the full list
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(stock_changes, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(StockChangeSerializer(page, many=True).data)
         if not stock_changes:
             return Response({"message": "No stock changes found"}, status=200)
         serializer = StockChangeSerializer(stock_changes, many=True)
@@ -153,44 +170,65 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="costs")
     def cost_analysis(self, request, system_id=None):
-        products = self.get_queryset()
-        result = []
-        for product in products:
-            purchase_orders = PurchaseOrder.objects.filter(
-                product=product, status__in=["completed", "partially_received"]
-            ).order_by("-order_date")
-            cost_groups = {}
-            for po in purchase_orders:
-                cost = po.cost
-                price = product.price
-                profit = price - cost
-                group_key = f"{cost}"
-                if group_key not in cost_groups:
-                    cost_groups[group_key] = {
-                        "cost": cost,
-                        "price": price,
-                        "profit": profit,
-                        "total_quantity": 0,
-                        "purchase_orders": [],
-                    }
-                cost_groups[group_key]["purchase_orders"].append({
-                    "id": po.id,
-                    "order_date": po.order_date,
-                    "quantity": po.quantity,
-                    "status": po.status,
-                })
-                cost_groups[group_key]["total_quantity"] += po.quantity
-            
-            product_cost_groups = list(cost_groups.values())
-            
-            result.append({
-                "product_id": product.id,
-                "product_name": product.name,
-                "cost_groups": product_cost_groups
+        """
+        Purchase-order cost groups per product in two queries however large the catalog:
+        the products (paginated by product when ?rows= is given) and their purchase orders.
+        """
+        products = self.get_queryset().order_by("id").values("id", "name", "price")
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(products, request, view=self)
+        if page is None:
+            products, in_scope = list(products), {"product__in": self.get_queryset()}
+        else:
+            products, in_scope = page, {"product_id__in": [product["id"] for product in page]}
+
+        result = {
+            product["id"]: {
+                "product_id": product["id"],
+                "product_name": product["name"],
+                "price": product["price"],
+                "cost_groups": {},
+            }
+            for product in products
+        }
+        purchase_orders = (
+            PurchaseOrder.objects.filter(status__in=["completed", "partially_received"], **in_scope)
+            .order_by("product_id", "-order_date")
+            .values_list("id", "product_id", "cost", "order_date", "quantity", "status")
+        )
+        # One pass over the product-ordered rows; newest orders first within each product
+        for po_id, product_id, cost, order_date, quantity, po_status in purchase_orders.iterator():
+            entry = result[product_id]
+            group = entry["cost_groups"].get(f"{cost}")
+            if group is None:
+                price = entry["price"]
+                group = entry["cost_groups"][f"{cost}"] = {
+                    "cost": cost,
+                    "price": price,
+                    "profit": price - cost,
+                    "total_quantity": 0,
+                    "purchase_orders": [],
+                }
+            group["purchase_orders"].append({
+                "id": po_id,
+                "order_date": order_date,
+                "quantity": quantity,
+                "status": po_status,
             })
-            
-        return Response(result)
-    
+            group["total_quantity"] += quantity
+
+        data = [
+            {
+                "product_id": entry["product_id"],
+                "product_name": entry["product_name"],
+                "cost_groups": list(entry["cost_groups"].values()),
+            }
+            for entry in result.values()
+        ]
+        if page is not None:
+            return paginator.get_paginated_response(data)
+        return Response(data)
+
     @action(detail=False, methods=["get"], url_path="expired")
     def expired_products(self, request, system_id=None):
         today = date.today()
@@ -202,11 +240,12 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         """
         Extra context provided to the serializer class.
         """
-        return {"request": self.request}
+        return {"request": self.request, "expand": InventorysupItemSerializer.requested_expansions(self.request)}
 
 
 class SaleViewSet(viewsets.ModelViewSet):
     serializer_class = SaleSerializer
+    pagination_class = CreatedAtCursorPagination  # Opt-in with ?rows= / ?cursor=
 
     def get_permissions(self):
         """
@@ -230,10 +269,11 @@ class SaleViewSet(viewsets.ModelViewSet):
         Permissions are handled by `get_permissions`.
         """
         system_id = self.kwargs.get("system_id")
+        # EXISTS instead of JOIN + DISTINCT keeps this on the (system, created_at) index
+        has_products = SaleItem.objects.filter(sale=OuterRef("pk"), product__isnull=False)
         return (
-            Sale.objects.filter(system_id=system_id, items__product__isnull=False)
-            .distinct()
-            .order_by("-created_at")
+            Sale.objects.filter(Exists(has_products), system_id=system_id)
+            .order_by("-created_at", "-id")
         )
 
     def get_serializer_class(self):
@@ -308,192 +348,82 @@ class SaleViewSet(viewsets.ModelViewSet):
 
         return Response(SaleSerializer(sale).data)
 
-    @action(detail=False, methods=["get"])
-    def daily_profit(self, request, system_id=None):
-        """Calculate daily profit with optional product filtering.
-           Permissions are handled by get_permissions."""
-        date = request.query_params.get("date")
-        product_id = request.query_params.get("product_id")
-
+    def profit_period(self, request, period):
+        """
+        [start, end) datetimes and a response label for ?date=YYYY-MM-DD (period="day")
+        or ?year=YYYY (period="year"), defaulting to the current one. Raises ValueError.
+        """
+        if period == "year":
+            year = request.query_params.get("year")
+            year = int(year) if year else timezone.localdate().year
+            return day_start(date(year, 1, 1)), day_start(date(year + 1, 1, 1)), {"year": year}
+        day = request.query_params.get("date")
+        day = datetime.strptime(day, "%Y-%m-%d").date() if day else timezone.localdate()
+        return day_start(day), day_start(day + timedelta(days=1)), {"date": day.strftime("%Y-%m-%d")}
+
+    def profit_report(self, request, system_id, period):
         try:
-            date = (
-                datetime.strptime(date, "%Y-%m-%d").date()
-                if date
-                else timezone.now().date()
-            )
+            start, end, label = self.profit_period(request, period)
         except ValueError:
-            return Response(
-                {"error": "Invalid date format. Use YYYY-MM-DD"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Get all sales for the date
-        sales = self.get_queryset().filter(created_at__date=date)
-
-        if product_id:
-            sales = sales.filter(items__product_id=product_id)
-
-        # Calculate profits for each sale item
-        product_totals = {}
-        total_sales = 0
-        total_profit = 0
-        total_discount = 0
-
-        for sale in sales:
-            for item in sale.items.all():
-                if not item.product:
-                    continue
-                if None in (item.unit_price, item.unit_cost, item.quantity, item.discount_amount, item.total_price):
-                    continue
-
-                product = item.product
-                if product.name not in product_totals:
-                    product_totals[product.name] = {
-                        "total_profit": 0,
-                        "total_quantity_sold": 0,
-                        "total_sales": 0,
-                        "total_discount": 0,
-                        "sales": [],
-                    }
-
-                # Calculate profit using the actual unit price (which includes discounts)
-                profit = (item.unit_price - item.unit_cost) * item.quantity
-                discount = item.discount_amount * item.quantity
-
-                product_totals[product.name]["total_profit"] += profit
-                product_totals[product.name]["total_quantity_sold"] += item.quantity
-                product_totals[product.name]["total_sales"] += item.total_price
-                product_totals[product.name]["total_discount"] += discount
-
-                # Add sale details
-                product_totals[product.name]["sales"].append(
-                    {
-                        "product_id": product.id,
-                        "product_name": product.name,
-                        "quantity_sold": item.quantity,
-                        "unit_price": item.unit_price,
-                        "original_price": item.unit_price + item.discount_amount,
-                        "discount_amount": item.discount_amount,
-                        "unit_cost": item.unit_cost,
-                        "profit": profit,
-                        "sale_time": sale.created_at.time(),
-                    }
-                )
-
-                total_sales += item.total_price
-                total_profit += profit
-                total_discount += discount
+            error = "Invalid year format" if period == "year" else "Invalid date format. Use YYYY-MM-DD"
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(
-            {
-                "date": date.strftime("%Y-%m-%d"),
-                "total_sales": total_sales,
-                "total_profit": total_profit,
-                "total_discount": total_discount,
-                "products": [
-                    {
-                        "product_name": name,
-                        "total_quantity_sold": data["total_quantity_sold"],
-                        "total_profit": data["total_profit"],
-                        "total_sales": data["total_sales"],
-                        "total_discount": data["total_discount"],
-                        "sales": data["sales"],
-                    }
-                    for name, data in product_totals.items()
-                ],
-            }
+        products, totals = product_profit_totals(
+            system_id, start, end, request.query_params.get("product_id")
         )
+        # Per-line detail is served page by page from profit_lines
+        return Response({**label, **totals, "products": products})
+
+    @action(detail=False, methods=["get"])
+    def daily_profit(self, request, system_id=None):
+        """Daily profit per product (?date=YYYY-MM-DD, optional ?product_id=).
+           Permissions are handled by get_permissions."""
+        return self.profit_report(request, system_id, "day")
 
     @action(detail=False, methods=["get"])
     def yearly_profit(self, request, system_id=None):
-        """Calculate yearly profits with optional product filtering"""
-        year = request.query_params.get("year")
-        product_id = request.query_params.get("product_id")
+        """Yearly profit per product (?year=YYYY, optional ?product_id=)"""
+        return self.profit_report(request, system_id, "year")
 
+    @action(detail=False, methods=["get"])
+    def profit_lines(self, request, system_id=None):
+        """
+        The sale lines behind daily_profit (?date=) or yearly_profit (?year=), newest
+        first, one cursor page at a time (?rows=, ?cursor=). Optional ?product_id=;
+        ?archived=true reads sales moved out by archive_history.
+        """
+        period = "year" if "year" in request.query_params else "day"
         try:
-            year = int(year) if year else timezone.now().year
+            start, end, _ = self.profit_period(request, period)
         except ValueError:
             return Response(
-                {"error": "Invalid year format"}, status=status.HTTP_400_BAD_REQUEST
+                {"error": "Use ?date=YYYY-MM-DD or ?year=YYYY"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get all sales for the year
-        sales = Sale.objects.filter(
-            system_id=system_id,
-            created_at__year=year,
-        )
-
-        if product_id:
-            sales = sales.filter(items__product_id=product_id)
-
-        # Calculate profits for each sale item
-        product_totals = {}
-        total_sales = 0
-        total_profit = 0
-        total_discount = 0
-
-        for sale in sales:
-            for item in sale.items.all():
-                if not item.product:
-                    continue
-
-                product = item.product
-                if product.name not in product_totals:
-                    product_totals[product.name] = {
-                        "total_profit": 0,
-                        "total_quantity_sold": 0,
-                        "total_sales": 0,
-                        "total_discount": 0,
-                        "sales": [],
-                    }
-
-                # Calculate profit using the actual unit price (which includes discounts)
-                profit = (item.unit_price - item.unit_cost) * item.quantity
-                discount = item.discount_amount * item.quantity
-
-                product_totals[product.name]["total_profit"] += profit
-                product_totals[product.name]["total_quantity_sold"] += item.quantity
-                product_totals[product.name]["total_sales"] += item.total_price
-                product_totals[product.name]["total_discount"] += discount
-
-                # Add sale details
-                product_totals[product.name]["sales"].append(
-                    {
-                        "product_id": product.id,
-                        "product_name": product.name,
-                        "quantity_sold": item.quantity,
-                        "unit_price": item.unit_price,
-                        "original_price": item.unit_price + item.discount_amount,
-                        "discount_amount": item.discount_amount,
-                        "unit_cost": item.unit_cost,
-                        "profit": profit,
-                        "sale_time": sale.created_at.time(),
-                    }
-                )
-
-                total_sales += item.total_price
-                total_profit += profit
-                total_discount += discount
-
-        return Response(
-            {
-                "year": year,
-                "total_sales": total_sales,
-                "total_profit": total_profit,
-                "total_discount": total_discount,
-                "products": [
-                    {
-                        "product_name": name,
-                        "total_quantity_sold": data["total_quantity_sold"],
-                        "total_profit": data["total_profit"],
-                        "total_sales": data["total_sales"],
-                        "total_discount": data["total_discount"],
-                        "sales": data["sales"],
-                    }
-                    for name, data in product_totals.items()
-                ],
-            }
+        archived = request.query_params.get("archived") == "true"
+        lines = sale_lines(system_id, start, end, request.query_params.get("product_id"), archived)
+        if not archived:
+            # Archived lines keep their own copy of the name
+            lines = lines.annotate(product_name=F("product__name"))
+        lines = lines.annotate(created_at=F("sale__created_at")).values(
+            "id",
+            "sale_id",
+            "product_id",
+            "product_name",
+            "created_at",
+            "unit_price",
+            "unit_cost",
+            "discount_amount",
+            quantity_sold=F("quantity"),
+            original_price=F("unit_price") + F("discount_amount"),
+            profit=ExpressionWrapper((F("unit_price") - F("unit_cost")) * F("quantity"), output_field=MONEY),
         )
+        paginator = CreatedAtCursorPagination()
+        paginator.opt_in = False  # A year of lines is exactly what this endpoint must not return at once
+        page = paginator.paginate_queryset(lines, request, view=self)
+        for line in page:
+            line["sale_time"] = line["created_at"].time()
+        return paginator.get_paginated_response(page)
 
 
 class SupplierViewSet(viewsets.ModelViewSet):
@@ -760,31 +690,16 @@ def supermarket_public_barcode_view(request, system, barcode):
     No authentication required.
     Uses subdomain from X-Subdomain header via middleware.
     """
-    try:
-        product = Product.objects.get(
-            system=system, barcode=barcode, stock_quantity__gt=0
-        )
-        product_data = {
-            "id": product.id,
-            "name": product.name,
-            "category": product.category,
-            "price": str(product.price),
-            "stock_quantity": product.stock_quantity,
-            "expiry_date": (
-                product.expiry_date.strftime("%Y-%m-%d")
-                if product.expiry_date
-                else None
-            ),
-            "minimum_stock": product.minimum_stock,
-            "barcode": product.barcode,
-            "image": product.image.url if product.image else None,
-        }
-        return Response(product_data)
-    except Product.DoesNotExist:
+    product = get_cached_product(system.id, barcode)
+    if product is None or product["stock_quantity"] <= 0:
         return Response(
             {"detail": "Product not found with the given barcode."},
             status=status.HTTP_404_NOT_FOUND,
         )
+    fields = (
+        "id", "name", "category", "price", "stock_quantity", "expiry_date", "minimum_stock", "barcode", "image",
+    )
+    return Response({field: product[field] for field in fields})
 
 
 # Analytics Views by ali for the supermarket
@@ -793,42 +708,28 @@ def supermarket_public_barcode_view(request, system, barcode):
 def order_summary(request, system_id):
     """Get order count summary for today, week, and month with change percentages"""
     try:
-        # Get current date and calculate previous periods
-        now = timezone.now()
-        today = now.date()
+        # Rolling periods and the ones before them, counted in a single query
+        today = timezone.now().date()
         yesterday = today - timedelta(days=1)
         last_week_start = today - timedelta(days=7)
         last_month_start = today - timedelta(days=30)
-
-        # Get sales for current periods
-        today_sales = Sale.objects.filter(
-            system_id=system_id, created_at__date=today
-        ).count()
-
-        week_sales = Sale.objects.filter(
-            system_id=system_id, created_at__date__gte=last_week_start
-        ).count()
-
-        month_sales = Sale.objects.filter(
-            system_id=system_id, created_at__date__gte=last_month_start
-        ).count()
-
-        # Get sales for previous periods
-        yesterday_sales = Sale.objects.filter(
-            system_id=system_id, created_at__date=yesterday
-        ).count()
-
-        last_week_sales = Sale.objects.filter(
-            system_id=system_id,
-            created_at__date__gte=last_week_start - timedelta(days=7),
-            created_at__date__lt=last_week_start,
-        ).count()
-
-        last_month_sales = Sale.objects.filter(
-            system_id=system_id,
-            created_at__date__gte=last_month_start - timedelta(days=30),
-            created_at__date__lt=last_month_start,
-        ).count()
+        counts = count_for_periods(
+            Sale.objects.filter(system_id=system_id),
+            {
+                "today": (today, today),
+                "yesterday": (yesterday, yesterday),
+                "week": (last_week_start, today),
+                "last_week": (last_week_start - timedelta(days=7), last_week_start - timedelta(days=1)),
+                "month": (last_month_start, today),
+                "last_month": (last_month_start - timedelta(days=30), last_month_start - timedelta(days=1)),
+            },
+        )
+        today_sales = counts["today"]
+        yesterday_sales = counts["yesterday"]
+        week_sales = counts["week"]
+        last_week_sales = counts["last_week"]
+        month_sales = counts["month"]
+        last_month_sales = counts["last_month"]
 
         # Calculate change percentages
         def calculate_change(current, previous):
@@ -864,73 +765,26 @@ def order_trend(request, system_id):
     view_type = request.GET.get("view", "daily")  # Default to daily view
 
     try:
+        today = timezone.localdate()
         if view_type == "daily":
-            # Get last 30 days of data
-            start_date = timezone.now().date() - timedelta(days=30)
-            sales = (
-                Sale.objects.filter(
-                    system_id=system_id, created_at__date__gte=start_date
-                )
-                .annotate(date=TruncDate("created_at"))
-                .values("date")
-                .annotate(orders=Count("id"))
-                .order_by("date")
-            )
-
-            # Format dates and ensure all dates are included
-            result = []
-            current_date = start_date
-            while current_date <= timezone.now().date():
-                date_str = current_date.isoformat()
-                day_data = next(
-                    (item for item in sales if item["date"] == current_date), None
-                )
-                result.append(
-                    {
-                        "date": current_date,
-                        "orders": day_data["orders"] if day_data else 0,
-                    }
-                )
-                current_date += timedelta(days=1)
-
+            # Last 30 days of data
+            interval = "daily"
+            start_date = today - timedelta(days=30)
         else:  # monthly view
-            # Get last 12 months of data
-            start_date = timezone.now().date() - timedelta(days=365)
-            sales = (
-                Sale.objects.filter(
-                    system_id=system_id, created_at__date__gte=start_date
-                )
-                .annotate(month=TruncDate("created_at"))
-                .values("month")
-                .annotate(orders=Count("id"))
-                .order_by("month")
-            )
+            # Last 12 months of data, starting at the month of the first day
+            interval = "monthly"
+            start_date = (today - timedelta(days=365)).replace(day=1)
 
-            result = []
-            current_date = start_date
-            while current_date <= timezone.now().date():
-                month_data = next(
-                    (
-                        item
-                        for item in sales
-                        if item["month"].strftime("%Y-%m")
-                        == current_date.strftime("%Y-%m")
-                    ),
-                    None,
-                )
-                result.append(
-                    {
-                        "date": current_date,
-                        "orders": month_data["orders"] if month_data else 0,
-                    }
-                )
-                # Move to first day of next month
-                if current_date.month == 12:
-                    current_date = current_date.replace(
-                        year=current_date.year + 1, month=1
-                    )
-                else:
-                    current_date = current_date.replace(month=current_date.month + 1)
+        sales = Sale.objects.filter(
+            system_id=system_id,
+            created_at__gte=day_start(start_date),
+            created_at__lt=day_start(today + timedelta(days=1)),
+        )
+        # One grouped query; days or months without sales are filled in with zero
+        result = [
+            {"date": bucket, "orders": orders}
+            for bucket, orders in time_series(sales, start_date, today, interval)
+        ]
 
         serializer = OrderTrendSerializer(data=result, many=True)
         serializer.is_valid(raise_exception=True)
@@ -1028,47 +882,18 @@ def daily_profit_history(request, system_id):
     except System.DoesNotExist:
         raise PermissionDenied("System not found.")
 
-    # Get all sales for the system
-    sales = Sale.objects.filter(system=system).order_by("created_at")
-
-    # Group sales by date
-    daily_profits = {}
-    for sale in sales:
-        date = sale.created_at.date()
-        if date not in daily_profits:
-            daily_profits[date] = {
-                "total_sales": 0,
-                "total_profit": 0,
-                "total_discount": 0,
-                "sales_count": 0,
-            }
-
-        # Calculate profit for each sale item
-        for item in sale.items.all():
-            if not item.product:
-                continue
-            if None in (item.unit_price, item.unit_cost, item.quantity, item.discount_amount, item.total_price):
-                continue
-
-            # Calculate profit using the actual unit price (which includes discounts)
-            profit = (item.unit_price - item.unit_cost) * item.quantity
-            discount = item.discount_amount * item.quantity
-
-            daily_profits[date]["total_sales"] += item.total_price
-            daily_profits[date]["total_profit"] += profit
-            daily_profits[date]["total_discount"] += discount
-            daily_profits[date]["sales_count"] += 1
+    # One pre-aggregated row per business day instead of every sale the system ever made
+    rollups = DailySalesRollup.objects.filter(system=system).order_by("day")
 
-    # Convert to list format
     result = [
         {
-            "date": date.strftime("%Y-%m-%d"),
-            "total_sales": float(data["total_sales"]),
-            "total_profit": float(data["total_profit"]),
-            "total_discount": float(data["total_discount"]),
-            "sales_count": data["sales_count"],
+            "date": rollup.day.strftime("%Y-%m-%d"),
+            "total_sales": float(rollup.revenue),
+            "total_profit": float(rollup.profit),
+            "total_discount": float(rollup.discount),
+            "sales_count": rollup.order_count,
         }
-        for date, data in sorted(daily_profits.items())
+        for rollup in rollups
     ]
 
     return Response(result)
@@ -1118,21 +943,57 @@ def get_used_categories(request, system_id):
     return Response(list(used_categories))
 
 
+MAX_BATCH_BARCODES = 500
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def get_products_by_barcodes(request, system_id):
+    """
+    Resolve many scans in one round trip: POST {"barcodes": [...]} (up to 500).
+    Returns the found products in request order and the barcodes that matched nothing.
+    """
+    barcodes = request.data.get("barcodes") if isinstance(request.data, dict) else None
+    if not isinstance(barcodes, list) or not barcodes:
+        return Response(
+            {"detail": "Provide a non-empty 'barcodes' list."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(barcodes) > MAX_BATCH_BARCODES:
+        return Response(
+            {"detail": f"At most {MAX_BATCH_BARCODES} barcodes per request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    barcodes = list(dict.fromkeys(str(barcode).strip() for barcode in barcodes))
+    found = get_cached_products(system_id, barcodes)
+    if not found and not System.objects.filter(id=system_id).exists():
+        raise PermissionDenied("System not found.")
+
+    fields = ProductBarcodeSerializer.Meta.fields
+    return Response(
+        {
+            "products": [
+                {field: found[barcode][field] for field in fields}
+                for barcode in barcodes
+                if barcode in found
+            ],
+            "missing": [barcode for barcode in barcodes if barcode not in found],
+        }
+    )
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_product_by_barcode(request, system_id, barcode):
-    """Get a product by its barcode"""
-    try:
-        system = System.objects.get(id=system_id)
-    except System.DoesNotExist:
-        raise PermissionDenied("System not found.")
+    """Get a product by its barcode (served from the barcode cache on repeat scans)"""
+    product = get_cached_product(system_id, barcode)
+    if product is not None:
+        return Response({field: product[field] for field in ProductBarcodeSerializer.Meta.fields})
 
-    try:
-        product = Product.objects.get(system=system, barcode=barcode)
-        serializer = ProductBarcodeSerializer(product)
-        return Response(serializer.data)
-    except Product.DoesNotExist:
-        return Response(
-            {"detail": "Product not found with the given barcode."},
-            status=status.HTTP_404_NOT_FOUND,
-        )
+    if not System.objects.filter(id=system_id).exists():
+        raise PermissionDenied("System not found.")
+    return Response(
+        {"detail": "Product not found with the given barcode."},
+        status=status.HTTP_404_NOT_FOUND,
+    )